@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from indygo_generator.generator import Generator
+from indygo_generator.header_scraping import scrape_header_file
+from indygo_generator.types import GoFunction, TypeGraph
+
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+DEFAULT_FUNCTIONS_PER_HEADER = 500
+STAGES = ['read_header_files', 'scrape_header_file', 'resolve_alias', 'create_go_functions', 'generate_code',
+          'generate']
+
+
+_TYPES_HEADER = """
+#ifndef __indy__types__included__
+#define __indy__types__included__
+
+    typedef uint8_t       indy_u8_t;
+    typedef uint32_t      indy_u32_t;
+    typedef int32_t       indy_i32_t;
+    typedef int32_t       indy_handle_t;
+    typedef unsigned int  indy_bool_t;
+    typedef long long     indy_i64_t;
+    typedef unsigned long long     indy_u64_t;
+
+#endif
+"""
+
+_HEADER_START = """
+#ifndef __indy__bench_{index}_included__
+#define __indy__bench_{index}_included__
+
+#include "indy_mod.h"
+#include "indy_types.h"
+
+#ifdef __cplusplus
+extern "C" {{
+#endif
+"""
+
+_HEADER_END = """
+#ifdef __cplusplus
+}
+#endif
+
+#endif
+"""
+
+# Shapes taken from ledger, did and anoncreds declarations, so that the corpus exercises the same code paths
+_DECLARATION_TEMPLATES = [
+    """
+    /// Signs and submits request message to validator pool.
+    ///
+    /// #Params
+    /// command_handle: command handle to map callback to caller context.
+    /// pool_handle: pool handle (created by open_pool_ledger).
+    /// wallet_handle: wallet handle (created by open_wallet).
+    /// submitter_did: Id of Identity stored in secured Wallet.
+    /// request_json: Request data json.
+    /// cb: Callback that takes command result as parameter.
+    extern indy_error_t indy_{name}(indy_handle_t command_handle,
+                                    indy_handle_t pool_handle,
+                                    indy_handle_t wallet_handle,
+                                    const char *  submitter_did,
+                                    const char *  request_json,
+
+                                    void           (*cb)(indy_handle_t xcommand_handle,
+                                                         indy_error_t  err,
+                                                         const char*   request_result_json)
+                                    );
+""",
+    """
+    /// Publishes request message to validator pool (no signing, unlike sign_and_submit_request).
+    extern indy_error_t indy_{name}(indy_handle_t command_handle,
+                                    indy_handle_t pool_handle,
+                                    const char *  request_json,
+
+                                    void           (*cb)(indy_handle_t xcommand_handle,
+                                                         indy_error_t  err,
+                                                         const char*   request_result_json)
+                                    );
+""",
+    """
+    /// Create credential definition entity that encapsulates credentials issuer DID, credential schema and signature.
+    extern indy_error_t indy_{name}(indy_handle_t command_handle,
+                                    indy_handle_t wallet_handle,
+                                    const char *  issuer_did,
+                                    const char *  revoc_def_type,
+                                    const char *  tag,
+                                    const char *  cred_def_id,
+                                    const char *  config_json,
+                                    indy_handle_t tails_writer_handle,
+
+                                    void           (*cb)(indy_handle_t xcommand_handle,
+                                                         indy_error_t  err,
+                                                         const char*   revoc_reg_id,
+                                                         const char*   revoc_reg_def_json,
+                                                         const char*   revoc_reg_entry_json)
+                                    );
+""",
+]
+
+
+def synthesize_corpus(corpus_path, function_count, functions_per_header=DEFAULT_FUNCTIONS_PER_HEADER):
+    with open(os.path.join(corpus_path, 'indy_types.h'), 'w') as f:
+        f.write(_TYPES_HEADER)
+
+    header_count = (function_count + functions_per_header - 1) // functions_per_header
+    for header_index in range(header_count):
+        first_function = header_index * functions_per_header
+        last_function = min(first_function + functions_per_header, function_count)
+        parts = [_HEADER_START.format(index=header_index)]
+        for function_index in range(first_function, last_function):
+            template = _DECLARATION_TEMPLATES[function_index % len(_DECLARATION_TEMPLATES)]
+            parts.append(template.format(name=f'bench_function_{function_index}'))
+        parts.append(_HEADER_END)
+
+        with open(os.path.join(corpus_path, f'indy_bench_{header_index:05}.h'), 'w') as f:
+            f.write(''.join(parts))
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def _scrape_all(header_file_contents):
+    scrape_results = {}
+    for file_name in sorted(header_file_contents):
+        scrape_results[file_name] = scrape_header_file(header_file_contents[file_name])
+    return scrape_results
+
+
+def _merge_type_maps(scrape_results):
+    # Mirrors the typedef merge done by Generator._prepare_c_function_declarations
+    full_type_map = {'indy_error_t': 'int32_t'}
+    for _, type_map, _ in scrape_results.values():
+        full_type_map.update(type_map)
+    return full_type_map
+
+
+def _resolve_all(scrape_results, full_type_map):
+    resolved_types = TypeGraph(full_type_map).resolved
+    for file_name, (declarations, type_map, enums) in scrape_results.items():
+        scrape_results[file_name] = ([declaration.resolve_alias(resolved_types) for declaration in declarations],
+                                     type_map, enums)
+
+
+def _create_go_functions(scrape_results):
+    for declarations, _, _ in scrape_results.values():
+        for declaration in declarations:
+            GoFunction.create_from_indy_declaration(declaration)
+
+
+def _generate_code(scrape_results):
+    for file_name, (declarations, _, _) in scrape_results.items():
+        Generator._generate_code(file_name, declarations)
+
+
+def run_stages(corpus_path, output_path):
+    timings = {}
+    generator = Generator(corpus_path, output_path)
+
+    timings['read_header_files'], header_file_contents = _timed(generator._read_header_files)
+    timings['scrape_header_file'], scrape_results = _timed(_scrape_all, header_file_contents)
+    full_type_map = _merge_type_maps(scrape_results)
+    timings['resolve_alias'], _ = _timed(_resolve_all, scrape_results, full_type_map)
+    timings['create_go_functions'], _ = _timed(_create_go_functions, scrape_results)
+    timings['generate_code'], _ = _timed(_generate_code, scrape_results)
+    timings['generate'], _ = _timed(Generator(corpus_path, output_path).generate)
+
+    return timings
+
+
+def benchmark_size(function_count, repeats):
+    with tempfile.TemporaryDirectory() as corpus_path, tempfile.TemporaryDirectory() as output_path:
+        synthesize_corpus(corpus_path, function_count)
+        corpus_bytes = sum(os.path.getsize(os.path.join(corpus_path, name)) for name in os.listdir(corpus_path))
+
+        samples = {stage: [] for stage in STAGES}
+        for _ in range(repeats):
+            timings = run_stages(corpus_path, output_path)
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds)
+
+    stages = {}
+    for stage, stage_samples in samples.items():
+        stages[stage] = {
+            'min': min(stage_samples),
+            'median': statistics.median(stage_samples),
+            'samples': stage_samples,
+            'functions_per_second': function_count / min(stage_samples) if min(stage_samples) else None,
+        }
+
+    return {'functions': function_count, 'corpus_bytes': corpus_bytes, 'stages': stages}
+
+
+def _git_revision():
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def compare_results(baseline, current):
+    lines = []
+    baseline_sizes = {result['functions']: result for result in baseline['results']}
+    for result in current['results']:
+        baseline_result = baseline_sizes.get(result['functions'])
+        if not baseline_result:
+            continue
+        for stage in STAGES:
+            before = baseline_result['stages'].get(stage, {}).get('min')
+            after = result['stages'].get(stage, {}).get('min')
+            if not before or not after:
+                continue
+            lines.append(f'{result["functions"]:>7} {stage:<20} {before:10.4f}s {after:10.4f}s {after / before:7.2f}x')
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks each stage of binding generation on synthetic headers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Function counts to benchmark')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of runs per size')
+    parser.add_argument('--output', help='Path of the JSON results file')
+    parser.add_argument('--compare', help='Path of a previous JSON results file to compare against')
+    args = parser.parse_args(argv)
+
+    results = {
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'results': [],
+    }
+    for size in args.sizes:
+        result = benchmark_size(size, args.repeats)
+        results['results'].append(result)
+        for stage in STAGES:
+            print(f'{size:>7} {stage:<20} {result["stages"][stage]["min"]:10.4f}s')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print('\n'.join(compare_results(baseline, results)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
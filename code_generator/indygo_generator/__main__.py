@@ -0,0 +1,107 @@
+import argparse
+import sys
+import time
+
+from indygo_generator.generator import Generator, GeneratorError
+from indygo_generator.profiling import GenerationProfile
+from indygo_generator.selection import FunctionSelection
+from indygo_generator.watch import HeaderWatcher
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog='indygo_generator', description='Generates Go bindings for libindy headers')
+    parser.add_argument('header_dir_path', help='Directory containing libindy header files')
+    parser.add_argument('output_path', help='Directory to write generated C and Go files to')
+    parser.add_argument('--cache', dest='cache_path', help='Path of the generated fragment cache')
+    parser.add_argument('--snapshot', dest='snapshot_path', help='Path of the scraped declaration snapshot')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('--profile', dest='profile_path', help='Write a JSON profiling report to given path')
+    parser.add_argument('--cprofile', dest='cprofile_path', help='Write cProfile stats of the run to given path')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Split the output of every header into up to given number of .go/.c file pairs')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Process one header at a time, keeping memory bounded by the largest header')
+    parser.add_argument('--instrument', action='store_true',
+                        help='Instrument generated functions with call metrics and hooks')
+    parser.add_argument('--ring-delivery', action='store_true',
+                        help='Deliver results through a C ring buffer drained by a goroutine, instead of calling '
+                             'exported Go callbacks from libindy threads (Linux only)')
+    parser.add_argument('--stubs', action='store_true',
+                        help='Also emit a stub libindy and Go benchmarks of every function running against it')
+    parser.add_argument('--include', dest='include_patterns', action='append', default=[], metavar='PATTERN',
+                        help='Only generate functions matching given libindy or Go name pattern, can be repeated')
+    parser.add_argument('--exclude', dest='exclude_patterns', action='append', default=[], metavar='PATTERN',
+                        help='Skip functions matching given libindy or Go name pattern, can be repeated')
+    parser.add_argument('--used-in', dest='go_source_path', metavar='GO_SOURCE_DIR',
+                        help='Only generate functions referenced by Go sources in given directory')
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument('--check', action='store_true',
+                            help='Only report output files that are out of date, exiting with 1 if there are any')
+    mode_group.add_argument('--watch', action='store_true',
+                            help='Keep running and regenerate headers as they change')
+    parser.add_argument('--interval', type=float, default=0.5, help='Polling interval in seconds for --watch')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    profile = None
+    if args.profile_path or args.cprofile_path:
+        profile = GenerationProfile(cprofile_path=args.cprofile_path)
+
+    selection = None
+    if args.include_patterns or args.exclude_patterns or args.go_source_path:
+        # Generated bindings reference every generated name, so they must not count as usages
+        selection = FunctionSelection(args.include_patterns, args.exclude_patterns, args.go_source_path,
+                                      ignored_paths=[args.output_path])
+
+    try:
+        generator = Generator(args.header_dir_path, args.output_path, cache_path=args.cache_path,
+                              workers=args.workers, profile=profile, snapshot_path=args.snapshot_path,
+                              instrument=args.instrument, stubs=args.stubs, selection=selection, shards=args.shards,
+                              streaming=args.streaming, ring_delivery=args.ring_delivery)
+        if args.check:
+            stale_file_names = generator.check()
+            for file_name in stale_file_names:
+                print(f'Out of date: {file_name}', file=sys.stderr)
+            if stale_file_names:
+                return 1
+        elif args.watch:
+            _watch(generator, args.interval)
+        else:
+            generator.generate()
+    except GeneratorError as e:
+        print(f'Generation failed: {e} ({e.__cause__})', file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if profile and args.profile_path:
+            profile.write_report(args.profile_path)
+
+    return 0
+
+
+def _watch(generator, interval):
+    watcher = HeaderWatcher(generator)
+    watcher.start()
+    print(f'Watching {generator.header_dir_path}', file=sys.stderr)
+
+    while True:
+        time.sleep(interval)
+        start = time.perf_counter()
+        try:
+            changed_file_names, removed_file_names = watcher.poll()
+        except GeneratorError as e:
+            # A half-edited header should not stop the watcher
+            print(f'Generation failed: {e} ({e.__cause__})', file=sys.stderr)
+            continue
+
+        if changed_file_names or removed_file_names:
+            updated_file_names = ', '.join(changed_file_names + removed_file_names)
+            print(f'Regenerated in {time.perf_counter() - start:.3f}s: {updated_file_names}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
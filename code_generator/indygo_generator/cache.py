@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+
+from indygo_generator.types import CallbackDeclaration, FunctionDeclaration
+from indygo_generator.utils import package_fingerprint
+
+
+_CACHE_FORMAT_VERSION = 1
+
+
+class CacheError(Exception):
+    pass
+
+
+def _canonical_form(item):
+    if isinstance(item, (FunctionDeclaration, CallbackDeclaration)):
+        return [type(item).__name__, item.name, item.return_type, [_canonical_form(p) for p in item.parameters]]
+    return [item.name, item.type]
+
+
+def _hash_json(value):
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# Persistent store of generated code fragments, keyed by a fingerprint of the declaration,
+# the resolved type map and the generator sources
+class FragmentCache:
+    def __init__(self, path, salt=None):
+        self._path = path
+        self._salt = salt if salt is not None else package_fingerprint()
+        self._type_map_digest = _hash_json({})
+        self._options_digest = _hash_json({})
+        self._entries = {}
+        self._used_entries = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        # Read once, later runs of a long running process (watch mode) work on the entries kept in memory
+        if self._loaded:
+            return
+
+        try:
+            with open(self._path, 'r') as f:
+                content = json.load(f)
+        except FileNotFoundError:
+            self._loaded = True
+            return
+        except (OSError, ValueError) as e:
+            raise CacheError(f'Failed to load fragment cache at path: {self._path}') from e
+
+        self._loaded = True
+        if content.get('version') != _CACHE_FORMAT_VERSION or content.get('salt') != self._salt:
+            return
+
+        self._entries = content.get('entries', {})
+
+    def start_run(self):
+        # Entries used by the previous run become the ones looked up, so that neither grows over a session
+        if self._used_entries:
+            self._entries = self._used_entries
+            self._used_entries = {}
+
+    def discard(self, declarations):
+        # Drops entries of declarations replaced by an incremental run, which keeps using all other entries
+        for declaration in declarations:
+            self._used_entries.pop(self.fingerprint(declaration), None)
+
+    def save(self):
+        # Only fragments used by the last run are kept, so the cache does not grow unbounded
+        content = {
+            'version': _CACHE_FORMAT_VERSION,
+            'salt': self._salt,
+            'entries': self._used_entries,
+        }
+        temp_path = self._path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(content, f, sort_keys=True)
+            os.replace(temp_path, self._path)
+        except OSError as e:
+            raise CacheError(f'Failed to save fragment cache at path: {self._path}') from e
+
+    def set_type_map(self, type_map):
+        self._type_map_digest = _hash_json(type_map)
+
+    def set_options(self, options):
+        self._options_digest = _hash_json(options)
+
+    def fingerprint(self, declaration):
+        return _hash_json([self._salt, self._type_map_digest, self._options_digest, _canonical_form(declaration)])
+
+    def get_fragments(self, declaration, generate_fragments):
+        fingerprint = self.fingerprint(declaration)
+        fragments = self._entries.get(fingerprint)
+        if fragments is None:
+            self.misses += 1
+            fragments = generate_fragments(declaration)
+        else:
+            self.hits += 1
+
+        self._used_entries[fingerprint] = list(fragments)
+        return tuple(fragments)
+
+    def subset(self, declarations):
+        # Picklable cache holding only the entries relevant to given declarations, used by worker processes
+        cache = FragmentCache(self._path, self._salt)
+        cache._type_map_digest = self._type_map_digest
+        cache._options_digest = self._options_digest
+        for declaration in declarations:
+            fingerprint = self.fingerprint(declaration)
+            fragments = self._entries.get(fingerprint)
+            if fragments is not None:
+                cache._entries[fingerprint] = fragments
+        return cache
+
+    def merge(self, other):
+        self._used_entries.update(other._used_entries)
+        self.hits += other.hits
+        self.misses += other.misses
@@ -0,0 +1,58 @@
+ERRORS_FILE_NAME = 'indy_errors.go'
+
+# Name of the enum libindy error codes are scraped from (indy_mod.h)
+ERROR_ENUM_NAME = 'indy_error_t'
+
+
+def find_error_enum(header_enums):
+    for file_name in sorted(header_enums.keys()):
+        for enum in header_enums[file_name]:
+            if enum.name == ERROR_ENUM_NAME:
+                return enum
+    return None
+
+
+def generate_errors_code(error_enum=None):
+    # Every known code gets a preallocated error value, so that failing calls do not allocate. Codes sharing a value
+    # (aliases) map to the first enumerator
+    error_values = []
+    seen_codes = set()
+    for name, code in (error_enum.values if error_enum else ()):
+        if code == 0 or code in seen_codes:
+            continue
+        seen_codes.add(code)
+        error_values.append((name, code))
+
+    parts = [_ERRORS_FILE_PREAMBLE]
+    if error_values:
+        variables = ''.join([f'\n\tErr{name} = &IndyError{{Code: {code}, Name: "{name}", '
+                             f'message: "Libindy returned code: {code} ({name})"}}' for name, code in error_values])
+        parts.append(f'var ({variables}\n)')
+
+    cases = ''.join([f'\n\tcase {code}:\n\t\treturn Err{name}' for name, code in error_values])
+    parts.append(f'// indyError returns the error value of given nonzero libindy error code\n'
+                 f'func indyError(code int32) error {{\n\tswitch code {{{cases}\n\t}}\n'
+                 f'\treturn &IndyError{{Code: code, message: fmt.Sprintf("Libindy returned code: %d", code)}}\n}}')
+    return '\n\n'.join(parts) + '\n'
+
+
+_ERRORS_FILE_PREAMBLE = """package indy
+
+import "fmt"
+
+// IndyError is an error code returned by libindy, either by a call itself or through its callback. Errors of codes
+// known at generation time are preallocated (ErrXxx), and compare equal with errors.Is by code
+type IndyError struct {
+	Code    int32
+	Name    string
+	message string
+}
+
+func (e *IndyError) Error() string {
+	return e.message
+}
+
+func (e *IndyError) Is(target error) bool {
+	other, ok := target.(*IndyError)
+	return ok && other.Code == e.Code
+}"""
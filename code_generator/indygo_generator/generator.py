@@ -1,8 +1,29 @@
+import io
 import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 
-from indygo_generator.header_scraping import scrape_header_file, ParsingError
-from indygo_generator.types import (FunctionParameter, cgo_to_go_conversion, get_cgo_type_for_go_type, GoFunction,
-                                    go_to_cgo_conversion, get_default_go_value, get_c_type_for_cgo_type, GoVariable)
+from indygo_generator.cache import FragmentCache, CacheError
+from indygo_generator.errors import ERRORS_FILE_NAME, find_error_enum, generate_errors_code
+from indygo_generator.header_scraping import scrape_header_file, scrape_header_types, ParsingError
+from indygo_generator.profiling import (NullProfile, ProfiledSink, PHASE_ALIAS_RESOLUTION, PHASE_EMISSION,
+                                        PHASE_FILE_WRITES, PHASE_GO_MODEL_CONSTRUCTION, PHASE_READING, PHASE_SCRAPING,
+                                        PHASE_TYPEDEF_MERGE)
+from indygo_generator.runtime import (GO_INSTRUMENTATION_CODE, GO_REGISTRY_TEST_CODE, GO_RING_CODE, GO_RUNTIME_CODE,
+                                     INSTRUMENTATION_FILE_NAME, REGISTRY_TEST_FILE_NAME, RING_C_CODE, RING_C_FILE_NAME,
+                                     RING_C_HEADER_CODE, RING_C_HEADER_FILE_NAME, RING_FILE_NAME, RUNTIME_FILE_NAME)
+from indygo_generator.selection import SelectionError
+from indygo_generator.snapshot import DeclarationSnapshot, SnapshotError, content_hash
+from indygo_generator.stubs import (BENCHMARK_MAIN_FILE_NAME, GO_BENCHMARK_MAIN_CODE, STUB_LIBRARY_FILE_NAME,
+                                    generate_benchmark_code, generate_stub_library_code)
+from indygo_generator.types import (CallbackDeclaration, clear_interned_tuples, FunctionParameter,
+                                    cgo_to_go_conversion, get_cgo_type_for_go_type, GoFunction, go_to_cgo_conversion,
+                                    get_default_go_value, get_c_type_for_cgo_type, GoVariable, pair_buffers,
+                                    parse_c_type, TypeGraph, TypeGraphError)
+from indygo_generator.utils import is_header_file_name, to_camel_case
 
 
 class GeneratorError(Exception):
@@ -18,90 +39,137 @@ def _callback_name_camel_case(function_name):
 
 class Generator:
     @staticmethod
-    def _generate_code(indy_file_name, declarations):
-        c_proxy_declarations = []
-        extern_declarations = []
-        c_proxy_definitions = []
-        go_code_sections = []
+    def _generate_code(indy_file_name, declarations, cache=None, profile=None, instrument=False, shard=None,
+                       ring=False):
+        c_sink = io.StringIO()
+        go_sink = io.StringIO()
+        Generator._emit_code(indy_file_name, declarations, c_sink, go_sink, cache, profile, instrument, shard, ring)
+        return c_sink.getvalue(), go_sink.getvalue()
 
+    @staticmethod
+    def _emit_code(indy_file_name, declarations, c_sink, go_sink, cache=None, profile=None, instrument=False,
+                   shard=None, ring=False):
+        # Fragments are written to the sinks as soon as each function is processed. Only the cgo preamble needs a
+        # separate (cheap) pass, since all proxy declarations must precede Go code
+        go_sink.write(_GO_FILE_PREAMBLE_START)
+        for i, indy_function_declaration in enumerate(declarations):
+            if i:
+                go_sink.write('\n')
+            go_sink.write(Generator._generate_c_proxy_declaration_code(indy_function_declaration))
+        go_sink.write(_GO_FILE_PREAMBLE_END)
+        go_sink.write(Generator._generate_symbol_table_code(indy_file_name, declarations, shard))
+
+        c_sink.write(_C_FILE_INCLUDES)
+        if ring:
+            c_sink.write(_C_RING_INCLUDE)
+
+        profile = profile or NullProfile()
+        generate_fragments = partial(Generator._generate_declaration_fragments, profile=profile,
+                                     instrument=instrument, ring=ring)
         for indy_function_declaration in declarations:
-            go_function = GoFunction.create_from_indy_declaration(indy_function_declaration)
-            c_proxy_declarations.append(Generator._generate_c_proxy_declaration_code(indy_function_declaration))
-            cb_extern_declaration, callback_code = Generator._generate_callback_code(go_function)
-            c_proxy_code = Generator._generate_c_proxy_code(indy_function_declaration)
-            extern_declarations.append(cb_extern_declaration)
-            c_proxy_definitions.append(c_proxy_code)
+            start = time.perf_counter()
+            if cache is None:
+                fragments = generate_fragments(indy_function_declaration)
+            else:
+                fragments = cache.get_fragments(indy_function_declaration, generate_fragments)
 
-            api_function_code = Generator._generate_api_function_code(go_function)
-            result_struct_code = Generator._generate_callback_result_struct_code(go_function)
-            go_code = '\n\n'.join([api_function_code, result_struct_code, callback_code])
-            go_code_sections.append(go_code)
+            cb_extern_declaration, c_proxy_code, go_code = fragments
+            c_sink.write(f'\n\n\n{cb_extern_declaration}\n{c_proxy_code}')
+            go_sink.write(f'\n\n{go_code}')
+            profile.record_declaration(indy_file_name, indy_function_declaration.name, time.perf_counter() - start)
 
-        include_code = f'#include <stdint.h>'
-        extern_declarations_code = '\n'.join(extern_declarations)
-        c_proxy_definitions_code = '\n\n\n'.join(c_proxy_definitions)
+    @staticmethod
+    def _generate_declaration_fragments(indy_function_declaration, profile=None, instrument=False, ring=False):
+        profile = profile or NullProfile()
+        start = time.perf_counter()
+        go_function = GoFunction.create_from_indy_declaration(indy_function_declaration)
+        go_model_constructed = time.perf_counter()
+        ring_value_kinds = _ring_value_kinds(indy_function_declaration) if ring else None
+        if ring_value_kinds is None:
+            cb_extern_declaration, callback_code = Generator._generate_callback_code(go_function, instrument)
+            c_proxy_code = Generator._generate_c_proxy_code(indy_function_declaration)
+        else:
+            # Results that cannot be copied into a ring entry keep being delivered through an exported callback
+            cb_extern_declaration = Generator._generate_ring_callback_code(indy_function_declaration, ring_value_kinds)
+            callback_code = Generator._generate_ring_completion_code(go_function, ring_value_kinds, instrument)
+            c_proxy_code = Generator._generate_c_proxy_code(indy_function_declaration,
+                                                            _ring_callback_name(indy_function_declaration))
 
-        line_sep = "\n"
-        go_file_top = f"""
-        package indy
-        
-        /*
-        #include <stdlib.h>
-        #include <stdint.h>
-        
-        {line_sep.join(c_proxy_declarations)}
-        */
-        import "C"
-        
-        import (
-            "fmt"
-            "unsafe"
-        )
-        
-        """
+        api_function_code = Generator._generate_api_function_code(go_function)
+        async_api_function_code = Generator._generate_async_api_function_code(go_function, instrument,
+                                                                              ring_value_kinds is not None)
+        future_code = Generator._generate_future_code(go_function, instrument)
+        result_struct_code = Generator._generate_callback_result_struct_code(go_function, instrument)
+        completion_pool_code = Generator._generate_completion_pool_code(go_function, instrument)
+        go_code = '\n\n'.join([api_function_code, async_api_function_code, future_code, result_struct_code,
+                                completion_pool_code, callback_code])
+
+        emitted = time.perf_counter()
+        profile.record(PHASE_GO_MODEL_CONSTRUCTION, go_model_constructed - start)
+        profile.record(PHASE_EMISSION, emitted - go_model_constructed,
+                       bytes_produced=len(cb_extern_declaration) + len(c_proxy_code) + len(go_code))
+        return cb_extern_declaration, c_proxy_code, go_code
 
-        c_code = '\n\n\n'.join([include_code, extern_declarations_code, c_proxy_definitions_code])
-        go_code = '\n\n'.join([go_file_top] + go_code_sections)
-        return c_code, go_code
+    @staticmethod
+    def _generate_symbol_table_code(indy_file_name, declarations, shard=None):
+        # Kept out of the cached fragments, since symbol indexes depend on the position within the header (or shard)
+        table_name = _symbol_table_name(indy_file_name, shard)
+        symbol_names = ''.join([f'\n\t"indy_{declaration.name}",' for declaration in declarations])
+        symbols = ''.join([f'\n\t{_symbol_name(declaration)} = {table_name}.symbol({i})'
+                           for i, declaration in enumerate(declarations)])
+        return f'var {table_name} = newSymbolTable({symbol_names}\n)\n\nvar ({symbols}\n)\n'
 
     @staticmethod
     def _generate_c_proxy_signature(func_declaration):
         passed_params = func_declaration.parameters[:-1]
-        c_proxy_declared_params = [FunctionParameter(name='f', type='void *')] + passed_params
+        c_proxy_declared_params = [FunctionParameter(name='f', type='void *')] + list(passed_params)
         param_string = ', '.join([f'{p.type} {p.name}' for p in c_proxy_declared_params])
         return f'{func_declaration.return_type} indy_{func_declaration.name}_proxy({param_string})'
 
     @staticmethod
     def _generate_c_proxy_declaration_code(func_declaration):
         passed_params = func_declaration.parameters[:-1]
-        c_proxy_declared_params = [FunctionParameter(name='f', type='void *')] + passed_params
+        c_proxy_declared_params = [FunctionParameter(name='f', type='void *')] + list(passed_params)
         param_string = ', '.join([f'{param.type} {param.name}' for param in c_proxy_declared_params])
         return f'{func_declaration.return_type} indy_{func_declaration.name}_proxy({param_string});'
 
     @staticmethod
-    def _generate_c_proxy_code(func_declaration):
+    def _generate_c_proxy_code(func_declaration, callback_name=None):
         signature_string = Generator._generate_c_proxy_signature(func_declaration)
         param_types_string = ', '.join([p.type for p in func_declaration.parameters])
         cast_string = f'{func_declaration.return_type} (*func)({param_types_string}) = f;'
-        callback_name = _callback_name_camel_case(func_declaration.name)
+        callback_name = callback_name or _callback_name_camel_case(func_declaration.name)
         param_names_string = ', '.join([p.name for p in func_declaration.parameters[:-1]])
         invocation_and_return_string = f'return func({param_names_string}, &{callback_name});'
         c_proxy_code = f'{signature_string} {{\n\t{cast_string}\n\t{invocation_and_return_string}\n}}'
         return c_proxy_code
 
     @staticmethod
-    def _generate_callback_result_struct_code(go_function):
+    def _generate_callback_result_struct_code(go_function, instrument=False):
         result_struct = go_function.result_struct
 
         field_declarations = []
         for field in result_struct.fields:
             field_declarations.append(f'{field.name} {field.type}')
+        if instrument:
+            field_declarations.append('completed int64')
         line_sep = "\n\t"
         code = f'type {result_struct.name} struct {{\n\t{line_sep.join(field_declarations)}\n}}'
         return code
 
     @staticmethod
-    def _generate_callback_code(go_function):
+    def _generate_completion_pool_code(go_function, instrument=False):
+        # Completions are buffered, so that the libindy callback thread never blocks on delivery
+        result_struct_name = go_function.result_struct.name
+        pool_name = _completion_pool_name(go_function)
+        code = (f'var {pool_name} = sync.Pool{{\n\tNew: func() interface{{}} {{\n\t\t'
+                f'return make(chan {result_struct_name}, 1)\n\t}},\n}}')
+        if instrument:
+            code += f'\n\nvar {_metrics_name(go_function)} = newCallMetrics("indy_{go_function.indy_function.name}")'
+        return code
+
+    @staticmethod
+    def _generate_callback_code(go_function, instrument=False):
         callback = go_function.callback
         cgo_callback_parameter_types = []
         for param in callback.parameters:
@@ -118,28 +186,89 @@ class Generator:
         signature_string = f'func {callback.name}({param_string})'
         first_param_name = callback.parameters[0].name
         deregister_call_string = _DEREGISTER_CALL_TEMPLATE.format(first_param_name)
+        completion_type = f'chan {go_function.result_struct.name}'
 
         result_struct = go_function.result_struct
+        callback_parameters = {param.name: param for param in callback.parameters}
         field_strings = []
-        for i, field in enumerate(result_struct.fields):
-            # skipping command handle
-            arg = callback.parameters[i+1]
+        for field in result_struct.fields:
+            arg = callback_parameters[field.name]
             cgo_to_go_conversion_function = cgo_to_go_conversion(arg.type)
-            if cgo_to_go_conversion_function:
+            if field.length:
+                # Copied exactly once - libindy owns the buffer only for the duration of the callback
+                field_string = f'{field.name}: C.GoBytes(unsafe.Pointer({arg.name}), C.int({field.length}))'
+            elif cgo_to_go_conversion_function:
                 field_string = f'{field.name}: {cgo_to_go_conversion_function}({arg.name})'
             else:
                 field_string = f'{field.name}: {arg.name}'
 
             field_strings.append(field_string)
+        if instrument:
+            field_strings.append('completed: monotonicNow()')
 
         join_string = ",\n\t\t"
-        res_init_string = f'res := &{result_struct.name}{{\n\t\t{join_string.join(field_strings)},\n\t}}'
-        res_send_string = 'resCh <- res'
+        res_send_string = (f'completion.({completion_type}) <- {result_struct.name}{{\n\t\t'
+                           f'{join_string.join(field_strings)},\n\t}}')
+        if instrument:
+            error_code_name = callback.parameters[1].name
+            res_send_string = f'{_metrics_name(go_function)}.completed({error_code_name})\n\t{res_send_string}'
 
-        full_code = f'{export_string}\n{signature_string} {{\n\t{deregister_call_string}{_DEREGISTER_CALL_ERR_CHECK}\n\t{res_init_string}\n\t{res_send_string}\n}}'
+        full_code = f'{export_string}\n{signature_string} {{\n\t{deregister_call_string}{_DEREGISTER_CALL_ERR_CHECK}\n\t{res_send_string}\n}}'
 
         return extern_declaration, full_code
 
+    @staticmethod
+    def _generate_ring_callback_code(func_declaration, value_kinds):
+        # Runs on the libindy thread - copies the results, which libindy owns only for the duration of the callback
+        callback = func_declaration.callback
+        param_string = ', '.join([f'{param.type} {param.name}' for param in callback.parameters])
+        signature_string = f'static void {_ring_callback_name(func_declaration)}({param_string})'
+
+        statements = ['indy_ring_entry entry = {0};',
+                      f'entry.command_handle = {callback.parameters[0].name};',
+                      f'entry.err = {callback.parameters[1].name};']
+        for i, ((param, length_param), kind) in enumerate(zip(pair_buffers(callback.parameters[2:]), value_kinds)):
+            if kind == _RING_BYTES:
+                statements.append(f'entry.values[{i}].data = indy_ring_copy_bytes({param.name}, {length_param.name});')
+                statements.append(f'entry.values[{i}].length = {length_param.name};')
+            elif kind == _RING_STRING:
+                statements.append(f'entry.values[{i}].data = indy_ring_copy_string({param.name});')
+            else:
+                statements.append(f'entry.values[{i}].number = (int64_t){param.name};')
+        statements.append('indy_ring_push(&entry);')
+
+        statements_string = '\n\t'.join(statements)
+        return f'{signature_string} {{\n\t{statements_string}\n}}'
+
+    @staticmethod
+    def _generate_ring_completion_code(go_function, value_kinds, instrument=False):
+        # Invoked by the ring drainer goroutine, in place of an exported callback
+        completion_name = _ring_completion_name(go_function)
+        result_struct = go_function.result_struct
+        error_code_field = result_struct.fields[0]
+        field_strings = [f'{error_code_field.name}: entry.errorCode()']
+        for i, (field, kind) in enumerate(zip(result_struct.fields[1:], value_kinds)):
+            if kind == _RING_BYTES:
+                value_string = f'entry.bytesValue({i})'
+            elif kind == _RING_STRING:
+                value_string = f'entry.stringValue({i})'
+            elif field.type == 'int64':
+                value_string = f'entry.numberValue({i})'
+            else:
+                value_string = f'{field.type}(entry.numberValue({i}))'
+            field_strings.append(f'{field.name}: {value_string}')
+        if instrument:
+            field_strings.append('completed: monotonicNow()')
+
+        join_string = ',\n\t\t'
+        send_string = f'c <- {result_struct.name}{{\n\t\t{join_string.join(field_strings)},\n\t}}'
+        if instrument:
+            send_string = f'{_metrics_name(go_function)}.completed(entry.errorCode())\n\t{send_string}'
+
+        type_code = f'type {completion_name} chan {result_struct.name}'
+        deliver_code = f'func (c {completion_name}) deliver(entry *ringEntry) {{\n\t{send_string}\n}}'
+        return f'{type_code}\n\n{deliver_code}'
+
     @staticmethod
     def _generate_variable_setup_code(go_variable):
         cgo_type = get_cgo_type_for_go_type(go_variable.type)
@@ -148,7 +277,8 @@ class Generator:
         cgo_var_declaration = f'var {cgo_var_name} {cgo_type}\n\t'
 
         if go_variable.type == 'string':
-            cgo_var_setup = f'if {go_variable.name} != "" {{\n\t\t{cgo_var_name} = C.CString({go_variable.name})\n\t\tdefer C.free(unsafe.Pointer({cgo_var_name}))\n\t}}'
+            # Copied into the call's argument arena, see _generate_arena_setup_code
+            cgo_var_setup = f'{cgo_var_name} = arena.cString({go_variable.name})'
         else:
             cgo_type_conversion = go_to_cgo_conversion(go_variable.type)
             if cgo_type_conversion:
@@ -160,31 +290,108 @@ class Generator:
         return cgo_var_name, code
 
     @staticmethod
-    def _generate_api_function_code(go_function):
+    def _generate_arena_setup_code(go_function):
+        # All string arguments share one C buffer, sized for their NUL terminated copies
+        string_params = [param for param in go_function.parameters if param.type == 'string']
+        if not string_params:
+            return None
+        size_terms = [f'len({param.name})' for param in string_params] + [str(len(string_params))]
+        return f'arena := acquireArena({" + ".join(size_terms)})'
+
+    @staticmethod
+    def _generate_buffer_setup_code(go_variable):
+        # Passed without copying, since libindy copies input buffers before the call returns
+        cgo_var_name = f'c_{go_variable.name}'
+        cgo_length_name = f'c_{go_variable.length}'
+        cgo_var_declaration = f'var {cgo_var_name} {get_cgo_type_for_go_type(go_variable.type)}\n\t'
+        cgo_var_setup = (f'if len({go_variable.name}) > 0 {{\n\t\t{cgo_var_name} = (*C.uint8_t)(unsafe.Pointer(&{go_variable.name}[0]))\n\t}}\n\t'
+                         f'{cgo_length_name} := C.uint32_t(len({go_variable.name}))')
+        code = f'\t{cgo_var_declaration}\n\t{cgo_var_setup}'
+        return [cgo_var_name, cgo_length_name], code
+
+    @staticmethod
+    def _generate_async_api_function_code(go_function, instrument=False, ring=False):
+        # Returns as soon as libindy accepted the call, so that callers can keep many calls in flight
         param_string = ', '.join([f'{param.name} {param.type}' for param in go_function.parameters])
-        signature_string = f'func {go_function.name}({param_string}) ({", ".join(rtype for rtype in go_function.return_types)})'
-        register_call_string = _REGISTER_CALL_TEMPLATE.format(go_function.indy_function.name)
-        returned_values_if_err = [get_default_go_value(return_type) for return_type in go_function.return_types[:-1]]
-        returned_values_if_err.append('err')
-        return_string_if_err = f'return {", ".join(returned_values_if_err)}'
-        err_check_string = f'if err != nil {{\n\t\t{return_string_if_err}\n\t}}'
+        future_name = _future_name(go_function)
+        signature_string = f'func {go_function.name}Async({param_string}) *{future_name}'
+        pool_name = _completion_pool_name(go_function)
+        lookup_string = f'pointer, err := {_symbol_name(go_function.indy_function)}.Pointer()'
+        lookup_check_string = f'if err != nil {{\n\t\treturn &{future_name}{{err: err}}\n\t}}'
+        completion_string = f'completion := {pool_name}.Get().(chan {go_function.result_struct.name})'
+        register_call_string = _REGISTER_CALL_STRING
+        if ring:
+            register_call_string = (f'commandHandle, err := resolver.RegisterCall('
+                                    f'{_ring_completion_name(go_function)}(completion))')
+            lookup_check_string += (f'\n\tif err := startRingDelivery(); err != nil {{\n\t\t'
+                                    f'return &{future_name}{{err: err}}\n\t}}')
+        recycle_string = f'{pool_name}.Put(completion)'
+        err_check_string = f'if err != nil {{\n\t\t{recycle_string}\n\t\treturn &{future_name}{{err: err}}\n\t}}'
 
-        cgo_var_names = ['commandHandle']
+        cgo_var_names = ['pointer', 'C.int32_t(commandHandle)']
         cgo_var_setup_strings = []
         for var in go_function.parameters:
-            cgo_var_name, cgo_var_setup_string = Generator._generate_variable_setup_code(var)
-            cgo_var_names.append(cgo_var_name)
+            if var.length:
+                buffer_cgo_var_names, cgo_var_setup_string = Generator._generate_buffer_setup_code(var)
+                cgo_var_names.extend(buffer_cgo_var_names)
+            else:
+                cgo_var_name, cgo_var_setup_string = Generator._generate_variable_setup_code(var)
+                cgo_var_names.append(cgo_var_name)
             cgo_var_setup_strings.append(cgo_var_setup_string)
 
+        arena_setup_string = Generator._generate_arena_setup_code(go_function)
+        if arena_setup_string:
+            cgo_var_setup_strings.insert(0, f'\t{arena_setup_string}')
         cgo_var_setup_string = '\n\n\t'.join(cgo_var_setup_strings)
 
         call_string = f'resCode := C.indy_{go_function.indy_function.name}_proxy({", ".join(cgo_var_names)})'
-        call_check_string = f'if resCode != 0 {{\n\terr = fmt.Errorf("Libindy returned code: %d", resCode)\n\t{return_string_if_err}\n\t}}'
+        if arena_setup_string:
+            # Libindy copies its arguments before returning, so the arena can be reused right away
+            call_string += '\n\treleaseArena(arena)'
+        if instrument:
+            call_string += f'\n\t{_metrics_name(go_function)}.submitted(started, int32(resCode))'
+        call_check_string = (f'if resCode != 0 {{\n\t\tresolver.DeregisterCall(commandHandle)\n\t\t{recycle_string}\n\t'
+                             f'return &{future_name}{{err: indyError(int32(resCode))}}\n\t}}')
+
+        return_string = f'return &{future_name}{{completion: completion}}'
+        if instrument:
+            lookup_string = f'started := monotonicNow()\n\t{lookup_string}'
+            return_string = f'return &{future_name}{{completion: completion, started: started}}'
 
-        result_retrieval_string = f'_res := <- resCh\n\tres := _res.(*{go_function.result_struct.name})'
+        code = (f'{signature_string} {{\n\t{lookup_string}\n\t{lookup_check_string}\n\n\t{completion_string}\n\t'
+                f'{register_call_string}\n\t{err_check_string}\n\n\t{cgo_var_setup_string}\n\n\t'
+                f'{call_string}\n\t{call_check_string}\n\n\t{return_string}\n}}')
+
+        return code
+
+    @staticmethod
+    def _generate_future_code(go_function, instrument=False):
+        future_name = _future_name(go_function)
+        result_struct_name = go_function.result_struct.name
+        started_field_string = '\n\tstarted int64' if instrument else ''
+        struct_code = (f'// {future_name} is the result of a {go_function.name}Async call. It can be waited on once\n'
+                       f'type {future_name} struct {{\n\tcompletion chan {result_struct_name}\n\terr error'
+                       f'{started_field_string}\n}}')
+
+        signature_string = f'func (f *{future_name}) Wait() ({", ".join(rtype for rtype in go_function.return_types)})'
+        returned_values_if_err = [get_default_go_value(return_type) for return_type in go_function.return_types[:-1]]
+        returned_values_if_err.append('err')
+        return_string_if_err = f'return {", ".join(returned_values_if_err)}'
+        returned_values_if_call_err = returned_values_if_err[:-1] + ['f.err']
+        call_err_check_string = f'if f.err != nil {{\n\t\treturn {", ".join(returned_values_if_call_err)}\n\t}}'
+        returned_values_if_waited = returned_values_if_err[:-1] + ['ErrFutureWaited']
+        call_err_check_string += (f'\n\tif f.completion == nil {{\n\t\treturn {", ".join(returned_values_if_waited)}'
+                                  f'\n\t}}')
+
+        pool_name = _completion_pool_name(go_function)
+        # The channel goes back to the pool, so the future must not receive from it again
+        result_retrieval_string = f'res := <-f.completion\n\t{pool_name}.Put(f.completion)\n\tf.completion = nil'
 
         error_code_field_name = go_function.result_struct.fields[0].name
-        error_code_check = f'if res.{error_code_field_name} != 0 {{\n\t\terr = fmt.Errorf("Libindy returned code: %d", res.{error_code_field_name})\n\t{return_string_if_err}\n\t}}'
+        if instrument:
+            result_retrieval_string += (f'\n\t{_metrics_name(go_function)}.collected(f.started, res.completed, '
+                                        f'res.{error_code_field_name})')
+        error_code_check = f'if res.{error_code_field_name} != 0 {{\n\t\terr := indyError(int32(res.{error_code_field_name}))\n\t{return_string_if_err}\n\t}}'
 
         returned_values = []
         for field in go_function.result_struct.fields[1:]:
@@ -193,76 +400,698 @@ class Generator:
 
         return_string = f'return {", ".join(returned_values)}'
 
-        code = (f'{signature_string} {{\n\t{register_call_string}\n\t{err_check_string}\n\n\t{cgo_var_setup_string}\n\n\t'
-                f'{call_string}\n\t{call_check_string}\n\n\t{result_retrieval_string}\n\n\t{error_code_check}\n\n\t{return_string}\n}}')
+        wait_code = (f'{signature_string} {{\n\t{call_err_check_string}\n\n\t{result_retrieval_string}\n\n\t'
+                     f'{error_code_check}\n\n\t{return_string}\n}}')
 
-        return code
+        return f'{struct_code}\n\n{wait_code}'
+
+    @staticmethod
+    def _generate_api_function_code(go_function):
+        param_string = ', '.join([f'{param.name} {param.type}' for param in go_function.parameters])
+        signature_string = f'func {go_function.name}({param_string}) ({", ".join(rtype for rtype in go_function.return_types)})'
+        argument_string = ', '.join([param.name for param in go_function.parameters])
+        return f'{signature_string} {{\n\treturn {go_function.name}Async({argument_string}).Wait()\n}}'
+
+    def __init__(self, header_dir_path, output_path, cache_path=None, workers=1, profile=None, snapshot_path=None,
+                 instrument=False, stubs=False, selection=None, shards=1, streaming=False, ring_delivery=False):
+        if streaming and (stubs or workers > 1):
+            # Both need the declarations of all headers at once
+            raise GeneratorError('Streaming generation supports neither stubs nor workers')
 
-    def __init__(self, header_dir_path, output_path):
         self._header_dir_path = header_dir_path
         self._output_path = output_path
+        self._workers = workers
+        self._instrument = instrument
+        self._stubs = stubs
+        self._selection = selection
+        self._shards = shards
+        self._streaming = streaming
+        self._ring_delivery = ring_delivery
+        self._profile = profile or NullProfile()
         self._c_function_declarations = {}
+        self._selected_declarations = {}
+        self._header_type_maps = {}
+        self._header_enums = {}
+        self._type_graph = TypeGraph({})
+        self._cache = FragmentCache(cache_path) if cache_path else None
+        self._snapshot = DeclarationSnapshot(snapshot_path) if snapshot_path else None
+        self._snapshot_loaded = False
 
     def generate(self):
-        self._prepare_c_function_declarations()
+        # Returns names of output files whose content changed - files with the same content are left untouched
+        with self._profile.session():
+            return self._generate()
+
+    def check(self):
+        # Returns names of output files that generate() would change, without writing anything
+        with self._profile.session():
+            return self._generate(check=True)
+
+    def update_headers(self, changed_file_names, removed_file_names=()):
+        # Re-scrapes and re-emits only the given headers, reusing declarations of all others that are kept in memory.
+        # Falls back to a full run when the merged typedefs change, since they affect every header
+        with self._profile.session():
+            if not self._c_function_declarations:
+                self._generate()
+                return
+
+            clear_interned_tuples()
+            header_type_maps = dict(self._header_type_maps)
+            changed_declarations = {}
+            for file_name in removed_file_names:
+                header_type_maps.pop(file_name, None)
+                self._header_enums.pop(file_name, None)
+
+            header_file_contents = {file_name: self._read_header_file(file_name) for file_name in changed_file_names}
+            for file_name, (declarations, type_map, enums) in self._scrape_headers(header_file_contents, map).items():
+                changed_declarations[file_name] = declarations
+                header_type_maps[file_name] = type_map
+                self._header_enums.pop(file_name, None)
+                if enums:
+                    self._header_enums[file_name] = enums
+
+            with self._profile.phase(PHASE_TYPEDEF_MERGE):
+                type_graph = self._build_type_graph(header_type_maps)
+            if type_graph.aliases != self._type_graph.aliases:
+                self._generate()
+                return
+
+            with self._profile.phase(PHASE_ALIAS_RESOLUTION):
+                resolved_types = self._type_graph.resolved
+                for file_name, declarations in changed_declarations.items():
+                    changed_declarations[file_name] = [declaration.resolve_alias(resolved_types)
+                                                       for declaration in declarations]
+
+            self._header_type_maps = header_type_maps
+            replaced_declarations = [declaration for file_name in [*changed_declarations, *removed_file_names]
+                                     for declaration in self._selected_declarations.get(file_name, ())]
+            for file_name in removed_file_names:
+                self._c_function_declarations.pop(file_name, None)
+                self._remove_output_files(file_name)
+            self._c_function_declarations.update(changed_declarations)
+            self._c_function_declarations = dict(sorted(self._c_function_declarations.items()))
+            self._selected_declarations = self._select_declarations(self._c_function_declarations)
+
+            self._load_cache(replaced_declarations)
+            self._write_output_files({file_name: self._selected_declarations[file_name]
+                                      for file_name in changed_declarations}, map)
+            self._write_errors_file()
+            self._write_stub_files()
+            self._save_cache()
+
+    def _generate(self, check=False):
+        clear_interned_tuples()
+        if self._streaming:
+            return self._generate_streaming(check)
+
+        with self._worker_pool() as map_function:
+            self._prepare_c_function_declarations(map_function)
+            self._selected_declarations = self._select_declarations(self._c_function_declarations)
+            self._load_cache()
+            changed_file_names = self._write_output_files(self._selected_declarations, map_function, check)
 
+        changed_file_names.extend(self._write_runtime_file(check))
+        changed_file_names.extend(self._write_errors_file(check))
+        changed_file_names.extend(self._write_stub_files(check))
+        if not check:
+            self._save_cache()
+        return sorted(changed_file_names)
+
+    def _generate_streaming(self, check=False):
+        # Reads, scrapes, emits and writes one header at a time, after a pre-scan of typedefs and enums (which every
+        # header may depend on). Declarations are dropped once written, so memory is bounded by the largest header
+        header_file_names = self._list_header_file_names()
+        header_type_maps = {}
+        header_enums = {}
+        for file_name in header_file_names:
+            header_file_content = self._read_header_file(file_name)
+            try:
+                with self._profile.phase(PHASE_SCRAPING):
+                    header_type_maps[file_name], enums = scrape_header_types(header_file_content)
+            except ParsingError as e:
+                raise GeneratorError(f'Failed to parse header file: {file_name}') from e
+            if enums:
+                header_enums[file_name] = enums
+
+        with self._profile.phase(PHASE_TYPEDEF_MERGE):
+            self._type_graph = self._build_type_graph(header_type_maps)
+        self._header_type_maps = header_type_maps
+        self._header_enums = header_enums
+        self._c_function_declarations = {}
+        self._selected_declarations = {}
+        self._load_cache()
+        referenced_names = self._scan_go_sources()
+
+        changed_file_names = []
+        resolved_types = self._type_graph.resolved
+        for file_name in header_file_names:
+            header_file_contents = {file_name: self._read_header_file(file_name)}
+            declarations, _, _ = self._scrape_headers(header_file_contents, map, save_snapshot=False)[file_name]
+            with self._profile.phase(PHASE_ALIAS_RESOLUTION):
+                declarations = [declaration.resolve_alias(resolved_types) for declaration in declarations]
+            selected_declarations = self._select_declarations({file_name: declarations}, referenced_names)
+            changed_file_names.extend(self._write_output_files(selected_declarations, map, check))
+
+        if self._snapshot is not None:
+            self._snapshot.retain(header_file_names)
+            self._save_snapshot()
+        changed_file_names.extend(self._write_runtime_file(check))
+        changed_file_names.extend(self._write_errors_file(check))
+        if not check:
+            self._save_cache()
+        return sorted(changed_file_names)
+
+    def _select_declarations(self, c_function_declarations, referenced_names=None):
+        # Filter stage between scraping and emission - unselected functions get no proxies, callbacks or stubs
+        if self._selection is None:
+            return c_function_declarations
+
+        try:
+            return self._selection.select(c_function_declarations, referenced_names)
+        except SelectionError as e:
+            raise GeneratorError('Error while selecting functions to generate') from e
+
+    def _scan_go_sources(self):
+        if self._selection is None:
+            return None
+
+        try:
+            return self._selection.scan_go_sources()
+        except SelectionError as e:
+            raise GeneratorError('Error while selecting functions to generate') from e
+
+    def _write_runtime_file(self, check=False):
+        runtime_files = {RUNTIME_FILE_NAME: GO_RUNTIME_CODE, REGISTRY_TEST_FILE_NAME: GO_REGISTRY_TEST_CODE}
+        optional_runtime_files = [
+            (self._instrument, {INSTRUMENTATION_FILE_NAME: GO_INSTRUMENTATION_CODE}),
+            (self._ring_delivery, {RING_FILE_NAME: GO_RING_CODE, RING_C_HEADER_FILE_NAME: RING_C_HEADER_CODE,
+                                   RING_C_FILE_NAME: RING_C_CODE}),
+        ]
+        changed_file_names = []
+        for enabled, files in optional_runtime_files:
+            if enabled:
+                runtime_files.update(files)
+                continue
+            for file_name in files:
+                if self._remove_file(file_name, check):
+                    changed_file_names.append(file_name)
+
+        for file_name, code in runtime_files.items():
+            runtime_file_path = os.path.join(self._output_path, file_name)
+            try:
+                if _write_file_if_changed(runtime_file_path, code, check):
+                    changed_file_names.append(file_name)
+            except OSError as e:
+                raise GeneratorError(f'Error while writing runtime file: {runtime_file_path}') from e
+        return changed_file_names
+
+    def _write_errors_file(self, check=False):
+        errors_file_path = os.path.join(self._output_path, ERRORS_FILE_NAME)
+        code = generate_errors_code(find_error_enum(self._header_enums))
         try:
-            for file_name, declarations in self._c_function_declarations.items():
-                c_code, go_code = Generator._generate_code(file_name, declarations)
-                base_file_name = file_name.replace('indy_', '')
-                base_file_name = base_file_name.split('.')[0]
+            return [ERRORS_FILE_NAME] if _write_file_if_changed(errors_file_path, code, check) else []
+        except OSError as e:
+            raise GeneratorError(f'Error while writing errors file: {errors_file_path}') from e
 
-                c_file_name = base_file_name + '.c'
-                with open(os.path.join(self._output_path, c_file_name), 'w') as f:
-                    f.write(c_code)
+    def _write_output_files(self, c_function_declarations, map_function, check=False):
+        file_names = list(c_function_declarations.keys())
+        declaration_lists = list(c_function_declarations.values())
+        output_paths = [self._output_path] * len(file_names)
+        if self._cache is None or map_function is map:
+            caches = [self._cache] * len(file_names)
+        else:
+            caches = [self._cache.subset(declarations) for declarations in declaration_lists]
+        if map_function is map:
+            profiles = [self._profile] * len(file_names)
+        else:
+            profiles = [self._profile.create_worker_profile() for _ in file_names]
 
-                go_file_name = base_file_name + '.go'
-                with open(os.path.join(self._output_path, go_file_name), 'w') as f:
-                    f.write(go_code)
+        instrument_flags = [self._instrument] * len(file_names)
+        check_flags = [check] * len(file_names)
+        shard_counts = [self._shards] * len(file_names)
+        ring_flags = [self._ring_delivery] * len(file_names)
 
+        results = map_function(_write_header_code, file_names, declaration_lists, output_paths, caches, profiles,
+                               instrument_flags, check_flags, shard_counts, ring_flags)
+        changed_file_names = []
+        try:
+            for cache, profile, header_changed_file_names in results:
+                if cache is not None and cache is not self._cache:
+                    self._cache.merge(cache)
+                if profile is not self._profile:
+                    self._profile.merge(profile)
+                changed_file_names.extend(header_changed_file_names)
         except OSError as e:
             raise GeneratorError(f'Error while writing output files') from e
+        return changed_file_names
+
+    def _write_stub_files(self, check=False):
+        # The stub library covers all headers, so it is regenerated whenever any of them changes
+        if not self._stubs:
+            return []
+
+        all_declarations = [declaration for declarations in self._selected_declarations.values()
+                            for declaration in declarations]
+        stub_files = {
+            STUB_LIBRARY_FILE_NAME: generate_stub_library_code(all_declarations),
+            BENCHMARK_MAIN_FILE_NAME: GO_BENCHMARK_MAIN_CODE,
+        }
+        changed_file_names = []
+        for file_name, declarations in self._selected_declarations.items():
+            benchmark_file_name = _output_base_name(file_name) + _BENCHMARK_FILE_SUFFIX
+            benchmark_code = generate_benchmark_code(declarations)
+            if benchmark_code:
+                stub_files[benchmark_file_name] = benchmark_code
+            elif self._remove_file(benchmark_file_name, check):
+                changed_file_names.append(benchmark_file_name)
+
+        try:
+            if not check:
+                os.makedirs(os.path.join(self._output_path, os.path.dirname(STUB_LIBRARY_FILE_NAME)), exist_ok=True)
+            for file_name, code in stub_files.items():
+                if _write_file_if_changed(os.path.join(self._output_path, file_name), code, check):
+                    changed_file_names.append(file_name)
+        except OSError as e:
+            raise GeneratorError(f'Error while writing stub files to: {self._output_path}') from e
+        return changed_file_names
+
+    def _remove_output_files(self, file_name):
+        try:
+            output_file_names = _output_file_names(file_name, self._output_path)
+        except OSError as e:
+            raise GeneratorError(f'Error while listing output files of: {file_name}') from e
+        for output_file_name in output_file_names + [_output_base_name(file_name) + _BENCHMARK_FILE_SUFFIX]:
+            self._remove_file(output_file_name)
+
+    def _remove_file(self, output_file_name, check=False):
+        output_file_path = os.path.join(self._output_path, output_file_name)
+        if check:
+            return os.path.exists(output_file_path)
+
+        try:
+            os.remove(output_file_path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            raise GeneratorError(f'Error while removing output file: {output_file_name}') from e
+        return True
+
+    @contextmanager
+    def _worker_pool(self):
+        if self._workers <= 1:
+            yield map
+            return
+
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            yield executor.map
+
+    def _load_cache(self, replaced_declarations=None):
+        # Full runs start over from the entries of the previous run, incremental runs (replaced_declarations given)
+        # only drop the entries of the declarations they replace
+        if self._cache is None:
+            return
+
+        try:
+            self._cache.load()
+        except CacheError as e:
+            raise GeneratorError('Error while loading fragment cache') from e
+
+        self._cache.set_type_map(self._type_graph.aliases)
+        self._cache.set_options({'instrument': self._instrument, 'ring_delivery': self._ring_delivery})
+        if replaced_declarations is None:
+            self._cache.start_run()
+        else:
+            self._cache.discard(replaced_declarations)
+
+    def _save_cache(self):
+        if self._cache is None:
+            return
+
+        try:
+            self._cache.save()
+        except CacheError as e:
+            raise GeneratorError('Error while saving fragment cache') from e
 
     def _read_header_files(self):
         header_file_contents = {}
+        start = time.perf_counter()
 
+        for header_file_name in self._list_header_file_names():
+            header_file_contents[header_file_name] = self._read_header_file(header_file_name)
+
+        self._profile.record(PHASE_READING, time.perf_counter() - start, calls=len(header_file_contents),
+                             bytes_produced=sum(len(content) for content in header_file_contents.values()))
+        return header_file_contents
+
+    def _list_header_file_names(self):
+        # Sorted, so that typedef merge and output order do not depend on directory listing order
         try:
-            for header_file_name in os.listdir(self._header_dir_path):
-                header_file_path = os.path.join(self._header_dir_path, header_file_name)
-                with open(header_file_path, 'r') as f:
-                    file_content = f.read()
-                    header_file_contents[header_file_name] = file_content
+            return sorted(file_name for file_name in os.listdir(self._header_dir_path)
+                          if is_header_file_name(file_name))
         except OSError as e:
             raise GeneratorError(f'Error while reading header files at path: {self._header_dir_path}') from e
 
-        return header_file_contents
+    def _read_header_file(self, header_file_name):
+        header_file_path = os.path.join(self._header_dir_path, header_file_name)
+        try:
+            with open(header_file_path, 'r') as f:
+                return f.read()
+        except OSError as e:
+            raise GeneratorError(f'Error while reading header file: {header_file_path}') from e
 
-    def _prepare_c_function_declarations(self):
+    def _prepare_c_function_declarations(self, map_function=map):
         header_file_contents = self._read_header_files()
-        # Small hack to allow parsing regex to be simpler (no need to match enum)
-        full_type_map = {'indy_error_t': 'int32_t'}
+        scrape_results = self._scrape_headers(header_file_contents, map_function, retain_snapshot=True)
+        header_type_maps = {}
+        header_enums = {}
         c_function_declarations = {}
 
-        try:
-            for file_name, file_content in header_file_contents.items():
-                declarations, type_map = scrape_header_file(file_content)
-                full_type_map.update(type_map)
+        with self._profile.phase(PHASE_TYPEDEF_MERGE):
+            for file_name, (declarations, type_map, enums) in scrape_results.items():
+                header_type_maps[file_name] = type_map
                 c_function_declarations[file_name] = declarations
+                if enums:
+                    header_enums[file_name] = enums
+            type_graph = self._build_type_graph(header_type_maps)
+
+        with self._profile.phase(PHASE_ALIAS_RESOLUTION):
+            resolved_types = type_graph.resolved
+            for file_name, function_declarations in c_function_declarations.items():
+                c_function_declarations[file_name] = [declaration.resolve_alias(resolved_types)
+                                                      for declaration in function_declarations]
+
+        self._c_function_declarations = c_function_declarations
+        self._header_type_maps = header_type_maps
+        self._header_enums = header_enums
+        self._type_graph = type_graph
+
+    def _build_type_graph(self, header_type_maps):
+        try:
+            return TypeGraph(_merge_type_maps(header_type_maps))
+        except TypeGraphError as e:
+            raise GeneratorError(f'Failed to resolve typedefs of header files at path: {self._header_dir_path}') from e
+
+    def _scrape_headers(self, header_file_contents, map_function, retain_snapshot=False, save_snapshot=True):
+        # Sorted, so that typedef merge and output order do not depend on directory listing order
+        file_names = sorted(header_file_contents.keys())
+        scrape_results = {}
+        if self._snapshot is not None:
+            if not self._snapshot_loaded:
+                self._load_snapshot()
+            header_hashes = {file_name: content_hash(header_file_contents[file_name]) for file_name in file_names}
+            for file_name in file_names:
+                scrape_result = self._snapshot.get(file_name, header_hashes[file_name])
+                if scrape_result is not None:
+                    scrape_results[file_name] = scrape_result
+
+        scraped_file_names = [file_name for file_name in file_names if file_name not in scrape_results]
+        try:
+            with self._profile.phase(PHASE_SCRAPING):
+                for file_name, scrape_result in zip(scraped_file_names, map_function(
+                        scrape_header_file, [header_file_contents[name] for name in scraped_file_names])):
+                    scrape_results[file_name] = scrape_result
         except ParsingError as e:
             raise GeneratorError(f'Failed to parse header files at path: {self._header_dir_path}') from e
 
-        for function_declarations in c_function_declarations.values():
-            for declaration in function_declarations:
-                declaration.resolve_alias(full_type_map)
+        if self._snapshot is not None:
+            for file_name in scraped_file_names:
+                declarations, type_map, enums = scrape_results[file_name]
+                self._snapshot.put(file_name, header_hashes[file_name], declarations, type_map, enums)
+            if retain_snapshot:
+                self._snapshot.retain(file_names)
+            if save_snapshot:
+                self._save_snapshot()
+
+        return {file_name: scrape_results[file_name] for file_name in file_names}
+
+    def _load_snapshot(self):
+        try:
+            self._snapshot.load()
+        except SnapshotError as e:
+            raise GeneratorError('Error while loading declaration snapshot') from e
+        self._snapshot_loaded = True
+
+    def _save_snapshot(self):
+        try:
+            self._snapshot.save()
+        except SnapshotError as e:
+            raise GeneratorError('Error while saving declaration snapshot') from e
+
+    @property
+    def header_dir_path(self):
+        return self._header_dir_path
+
+    @property
+    def resolved_types(self):
+        # Type string -> type string with typedefs resolved, shared by everything emitting code for the headers
+        return self._type_graph.resolved
+
+
+def _merge_type_maps(header_type_maps):
+    # Enum typedefs are scraped as enums rather than aliases, so the type of the error enum is supplied here
+    full_type_map = {'indy_error_t': 'int32_t'}
+    for file_name in sorted(header_type_maps.keys()):
+        full_type_map.update(header_type_maps[file_name])
+    return full_type_map
+
+
+def _symbol_table_name(file_name, shard=None):
+    # Unsharded table names all end in Symbols, so shard tables cannot collide with the table of another header
+    table_name = to_camel_case(_output_base_name(file_name)) + 'Symbols'
+    if shard is None:
+        return table_name
+    return f'{table_name}Shard{shard}'
+
+
+def _symbol_name(function_declaration):
+    return to_camel_case(function_declaration.name) + 'Symbol'
+
+
+def _future_name(go_function):
+    return f'{go_function.name}Future'
+
+
+def _metrics_name(go_function):
+    return go_function.name[0].lower() + go_function.name[1:] + 'Metrics'
+
+
+def _completion_pool_name(go_function):
+    return go_function.name[0].lower() + go_function.name[1:] + 'Completions'
+
+
+def _ring_callback_name(function_declaration):
+    return f'indy_{function_declaration.name}_ring_callback'
 
-        self._c_function_declarations = c_function_declarations
 
+def _ring_completion_name(go_function):
+    return go_function.name[0].lower() + go_function.name[1:] + 'RingCompletion'
 
 
-_REGISTER_CALL_TEMPLATE = 'pointer, commandHandle, resCh, err := resolver.RegisterCall("indy_{}")'
-_DEREGISTER_CALL_TEMPLATE = 'resCh, err := resolver.DeregisterCall({})'
+def _ring_value_kinds(function_declaration):
+    # Kind of each ring entry value the callback results are copied into, or None if some result does not fit one
+    callback = function_declaration.callback
+    if callback.return_type != 'void' or len(callback.parameters) < 2:
+        return None
+
+    value_kinds = []
+    for param, length_param in pair_buffers(callback.parameters[2:]):
+        if isinstance(param, CallbackDeclaration):
+            return None
+        c_type = parse_c_type(param.type)
+        if length_param:
+            value_kinds.append(_RING_BYTES)
+        elif c_type.spelling == 'char *':
+            value_kinds.append(_RING_STRING)
+        elif not c_type.pointer_depth and c_type.go_type in _RING_NUMBER_GO_TYPES:
+            value_kinds.append(_RING_NUMBER)
+        else:
+            return None
+    if len(value_kinds) > _RING_MAX_VALUES:
+        return None
+    return value_kinds
+
+
+def _output_base_name(file_name, shard=None):
+    # Base names never contain a dot, so shard names cannot collide with the outputs of another header (ledger_2.h)
+    base_file_name = file_name.replace('indy_', '').split('.')[0]
+    if shard is None:
+        return base_file_name
+    return f'{base_file_name}.shard{shard}'
+
+
+def _output_file_names(file_name, output_path):
+    # Every .c/.go pair generated for the header, sharded or not
+    output_file_patt = re.compile(re.escape(_output_base_name(file_name)) + r'(\.shard\d+)?\.(c|go)')
+    try:
+        return sorted(output_file_name for output_file_name in os.listdir(output_path)
+                      if output_file_patt.fullmatch(output_file_name))
+    except FileNotFoundError:
+        return []
+
+
+def _shard_declarations(declarations, shards):
+    # Contiguous runs of roughly equal weight, so that editing a header mostly changes the shard containing the edit.
+    # Weight approximates the amount of generated code, which grows with the number of (callback) parameters
+    if shards <= 1:
+        return [declarations]
+
+    weights = [1 + sum(1 + len(getattr(param, 'parameters', ())) for param in declaration.parameters)
+               for declaration in declarations]
+    shard_count = max(1, min(shards, len(declarations)))
+    total_weight = sum(weights)
+    sharded_declarations = [[] for _ in range(shard_count)]
+    cumulative_weight = 0
+    for declaration, weight in zip(declarations, weights):
+        shard = min(cumulative_weight * shard_count // total_weight, shard_count - 1)
+        sharded_declarations[shard].append(declaration)
+        cumulative_weight += weight
+    return sharded_declarations
+
+
+def _write_header_code(file_name, declarations, output_path, cache, profile, instrument, check, shards=1, ring=False):
+    # Module level, so that it can be dispatched to worker processes
+    sharded_declarations = _shard_declarations(declarations, shards)
+    changed_file_names = []
+    output_file_names = []
+    for shard, shard_declarations in enumerate(sharded_declarations):
+        shard = shard if shards > 1 else None
+        base_file_name = _output_base_name(file_name, shard)
+        output_file_names.extend([base_file_name + '.c', base_file_name + '.go'])
+        changed_file_names.extend(_write_shard_code(file_name, shard, shard_declarations, output_path, cache,
+                                                    profile, instrument, check, ring))
+
+    # Leftovers of a previous run with a different shard count
+    for stale_file_name in _output_file_names(file_name, output_path):
+        if stale_file_name in output_file_names:
+            continue
+        if not check:
+            os.remove(os.path.join(output_path, stale_file_name))
+        changed_file_names.append(stale_file_name)
+    return cache, profile, changed_file_names
+
+
+def _write_shard_code(file_name, shard, declarations, output_path, cache, profile, instrument, check, ring):
+    # Code is streamed to temporary files, which replace the outputs only if their content differs, so that unchanged
+    # files keep their mtime
+    base_file_name = _output_base_name(file_name, shard)
+    output_file_names = [base_file_name + '.c', base_file_name + '.go']
+    output_file_paths = [os.path.join(output_path, output_file_name) for output_file_name in output_file_names]
+
+    if check:
+        codes = Generator._generate_code(file_name, declarations, cache, profile, instrument, shard, ring)
+        return [output_file_name for output_file_name, output_file_path, code
+                in zip(output_file_names, output_file_paths, codes)
+                if _read_output_file(output_file_path) != code]
+
+    c_temp_path, go_temp_path = [_temp_path(output_file_path) for output_file_path in output_file_paths]
+    try:
+        with open(c_temp_path, 'w', buffering=_OUTPUT_BUFFER_SIZE) as c_file, \
+                open(go_temp_path, 'w', buffering=_OUTPUT_BUFFER_SIZE) as go_file:
+            if profile.enabled:
+                Generator._emit_code(file_name, declarations, ProfiledSink(c_file, profile),
+                                     ProfiledSink(go_file, profile), cache, profile, instrument, shard, ring)
+                with profile.phase(PHASE_FILE_WRITES):
+                    c_file.flush()
+                    go_file.flush()
+            else:
+                Generator._emit_code(file_name, declarations, c_file, go_file, cache, profile, instrument, shard,
+                                     ring)
+
+        changed_file_names = [output_file_name for output_file_name, output_file_path, temp_path
+                              in zip(output_file_names, output_file_paths, [c_temp_path, go_temp_path])
+                              if _replace_if_changed(temp_path, output_file_path)]
+    finally:
+        for temp_path in (c_temp_path, go_temp_path):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    return changed_file_names
+
+
+def _temp_path(path):
+    return path + '.tmp'
+
+
+def _read_output_file(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _same_content(path, other_path):
+    try:
+        if os.path.getsize(path) != os.path.getsize(other_path):
+            return False
+    except FileNotFoundError:
+        return False
+
+    with open(path, 'rb') as f, open(other_path, 'rb') as other_f:
+        return f.read() == other_f.read()
+
+
+def _replace_if_changed(temp_path, path):
+    if _same_content(temp_path, path):
+        os.remove(temp_path)
+        return False
+
+    os.replace(temp_path, path)
+    return True
+
+
+def _write_file_if_changed(path, content, check=False):
+    if _read_output_file(path) == content:
+        return False
+    if check:
+        return True
+
+    temp_path = _temp_path(path)
+    with open(temp_path, 'w') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    return True
+
+
+_OUTPUT_BUFFER_SIZE = 64 * 1024
+_BENCHMARK_FILE_SUFFIX = '_bench_test.go'
+_C_FILE_INCLUDES = '#include <stdint.h>'
+_C_RING_INCLUDE = '\n#include "indy_ring.h"'
+_GO_FILE_PREAMBLE_START = """
+        package indy
+        
+        /*
+        #include <stdlib.h>
+        #include <stdint.h>
+        
+        """
+_GO_FILE_PREAMBLE_END = """
+        */
+        import "C"
+        
+        import (
+            "fmt"
+            "sync"
+            "unsafe"
+        )
+        
+        // Keeps imports used in files whose functions do not need all of them
+        var (
+            _ = fmt.Errorf
+            _ sync.Pool
+            _ unsafe.Pointer
+        )
+        
+        """
+_RING_MAX_VALUES = 8  # INDY_RING_MAX_VALUES of the ring runtime
+_RING_BYTES = 'bytes'
+_RING_STRING = 'string'
+_RING_NUMBER = 'number'
+_RING_NUMBER_GO_TYPES = {'int32', 'uint32', 'int64', 'uint64'}
+_REGISTER_CALL_STRING = 'commandHandle, err := resolver.RegisterCall(completion)'
+_DEREGISTER_CALL_TEMPLATE = 'completion, registryErr := resolver.DeregisterCall({})'
 _DEREGISTER_CALL_ERR_CHECK = """
-    if err != nil {
+    if registryErr != nil {
         panic("Invalid handle in callback")
     }
 """
\ No newline at end of file
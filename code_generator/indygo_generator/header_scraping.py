@@ -1,134 +1,305 @@
 import re
 
 
-from indygo_generator.types import FunctionDeclaration, FunctionParameter, CallbackDeclaration
+from indygo_generator.errors import ERROR_ENUM_NAME
+from indygo_generator.types import CallbackDeclaration, EnumDeclaration, FunctionDeclaration, FunctionParameter
 
 
-_REPLACEMENT_TABLE = str.maketrans({'\n': ' ', '\t': ' '})
-_MULTI_SPACE_PATT = re.compile('\s{2,}')
-_HEADER_FUNCTION_PATT = re.compile('extern\s+?(?P<declaration>[\w\s]+?indy.+?;)', re.DOTALL)
-_HEADER_TYPEDEF_PATT = re.compile('typedef\s+?(?P<types>[\w\s]+?);')
-_FUNCTION_DECLARATION_PATT = re.compile('(?P<rtype>\w+?)\s+?\(?(?P<fname>[\w*]+?)\)?\((?P<param_string>.+?)\);', re.DOTALL)
+# Each alternative is decided by its first character, so tokenizing never backtracks across tokens
+_TOKEN_PATT = re.compile(r'''
+    (?P<skipped>(?:\s+|//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/|\#(?:\\\n|[^\n])*)+)
+  | (?P<unterminated_comment>/\*)
+  | (?P<identifier>[A-Za-z_]\w*)
+  | (?P<punctuation>[(){}\[\];,*=&<>+\-|~!.:?/^%])
+  | (?P<number>\d\w*)
+  | (?P<string>"(?:\\.|[^"\\\n])*")
+  | (?P<character>'(?:\\.|[^'\\\n])*')
+  | (?P<invalid>.)
+''', re.VERBOSE | re.DOTALL)
 
 
 class ParsingError(Exception):
     pass
 
 
-def scrape_header_file(header_file_content):
-    declarations = []
+class _Token:
+    __slots__ = ('kind', 'value', 'start', 'end')
+
+    def __init__(self, kind, value, start, end):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f'{self.kind}:{self.value}'
+
+
+def _tokenize(source):
+    tokens = []
+
+    for match in _TOKEN_PATT.finditer(source):
+        kind = match.lastgroup
+        if kind == 'skipped':
+            continue
+        if kind == 'invalid':
+            raise ParsingError(f'Unexpected character {match.group()!r} at offset {match.start()}')
+        if kind == 'unterminated_comment':
+            # Tokenizing the rest of a truncated header as code would silently produce wrong declarations
+            raise ParsingError(f'Unterminated comment at offset {match.start()}')
+        tokens.append(_Token(kind, match.group(), match.start(), match.end()))
+
+    return tokens
+
+
+class _Parser:
+    def __init__(self, source):
+        self._tokens = _tokenize(source)
+        self._position = 0
+        self.enums = []
+
+    def parse_header(self, typedefs_only=False):
+        # With typedefs_only, function declarations are skipped up to their ';' instead of being parsed
+        declarations = []
+        type_map = {}
+        tokens = self._tokens
+
+        while self._position < len(tokens):
+            token = tokens[self._position]
+            if token.value == 'extern':
+                self._position += 1
+                if self._peek_kind() == 'string':
+                    # extern "C" linkage specification
+                    self._position += 1
+                    continue
+                if typedefs_only:
+                    self._skip_statement()
+                    continue
+                declarations.append(self._parse_extern_declaration())
+            elif token.value == 'typedef':
+                self._position += 1
+                typedef = self._parse_typedef()
+                if typedef:
+                    alias, c_type = typedef
+                    type_map[alias] = c_type
+            else:
+                self._position += 1
+
+        return declarations, type_map
+
+    def parse_declaration(self):
+        declaration = self._parse_extern_declaration()
+        if self._position != len(self._tokens):
+            raise ParsingError(f'Unexpected tokens after declaration: {self._tokens[self._position:]}')
+        return declaration
+
+    def parse_parameter_list(self):
+        parameters = self._parse_parameter_list()
+        if self._position != len(self._tokens):
+            raise ParsingError(f'Unexpected tokens after parameters: {self._tokens[self._position:]}')
+        return parameters
+
+    def parse_typedef(self):
+        return self._parse_typedef(terminated=False)
+
+    def _peek_kind(self, offset=0):
+        position = self._position + offset
+        if position >= len(self._tokens):
+            return None
+        return self._tokens[position].kind
+
+    def _peek_value(self, offset=0):
+        position = self._position + offset
+        if position >= len(self._tokens):
+            return None
+        return self._tokens[position].value
+
+    def _expect(self, value):
+        if self._peek_value() != value:
+            found = self._peek_value()
+            raise ParsingError(f'Expected {value!r}, found {found!r} at token {self._position}')
+        self._position += 1
+
+    def _type_string(self, start, end):
+        # Keeps the original spelling of the type ('char*' vs 'char *'), collapsing any whitespace to one space
+        tokens = self._tokens
+        if start >= end:
+            raise ParsingError(f'Missing type at token {start}')
+
+        parts = [tokens[start].value]
+        for i in range(start + 1, end):
+            if tokens[i].start != tokens[i - 1].end:
+                parts.append(' ')
+            parts.append(tokens[i].value)
+        return ''.join(parts)
+
+    def _consume_specifiers(self):
+        start = self._position
+        while self._peek_kind() == 'identifier' or self._peek_value() == '*':
+            self._position += 1
+        return start, self._position
+
+    def _parse_extern_declaration(self):
+        start, end = self._consume_specifiers()
+        if end - start < 2 or self._tokens[end - 1].kind != 'identifier':
+            raise ParsingError(f'Invalid function declaration at token {start}')
+
+        return_type = self._type_string(start, end - 1)
+        function_name = self._tokens[end - 1].value.replace('indy_', '', 1)
+        parameters = self._parse_parameter_list()
+        self._expect(';')
+        return FunctionDeclaration(function_name, return_type, parameters)
+
+    def _parse_parameter_list(self):
+        self._expect('(')
+        parameters = []
+
+        if self._peek_value() == ')':
+            self._position += 1
+            return parameters
+
+        if self._peek_value() == 'void' and self._peek_value(1) == ')':
+            self._position += 2
+            return parameters
+
+        while True:
+            parameters.append(self._parse_parameter())
+            separator = self._peek_value()
+            self._position += 1
+            if separator == ')':
+                return parameters
+            if separator != ',':
+                raise ParsingError(f'Expected "," or ")" in parameter list, found {separator!r}')
+
+    def _parse_parameter(self):
+        start, end = self._consume_specifiers()
+
+        if self._peek_value() == '(' and self._peek_value(1) == '*':
+            return_type = self._type_string(start, end)
+            self._position += 2
+            if self._peek_kind() != 'identifier':
+                raise ParsingError(f'Expected callback name at token {self._position}')
+            name = self._tokens[self._position].value
+            self._position += 1
+            self._expect(')')
+            parameters = self._parse_parameter_list()
+            return CallbackDeclaration(name, return_type, parameters)
+
+        if end - start < 2 or self._tokens[end - 1].kind != 'identifier':
+            raise ParsingError(f'Invalid function parameter at token {start}')
+
+        return FunctionParameter(self._tokens[end - 1].value, self._type_string(start, end - 1))
+
+    def _parse_typedef(self, terminated=True):
+        start, end = self._consume_specifiers()
+
+        if self._peek_value() == '{' and self._tokens[start].value == 'enum':
+            enum_start = self._position
+            try:
+                self.enums.append(self._parse_enum())
+            except ParsingError:
+                # Only the error enum is needed, other enums may use any constant expression and are skipped
+                self._position = enum_start
+                self._skip_statement()
+                if self._tokens[self._position - 2].value == ERROR_ENUM_NAME:
+                    raise
+            return None
+
+        if self._peek_value() in ('{', '('):
+            # Aggregates and function pointer types are not aliases of plain C types
+            self._skip_statement()
+            return None
+
+        if end - start < 2:
+            raise ParsingError(f'Invalid typedef at token {start}')
+
+        if terminated:
+            self._expect(';')
+
+        return self._tokens[end - 1].value, self._type_string(start, end - 1)
+
+    def _parse_enum(self):
+        self._expect('{')
+        values = []
+        known_values = {}
+        next_value = 0
+
+        while self._peek_value() != '}':
+            if self._peek_kind() != 'identifier':
+                raise ParsingError(f'Expected enumerator name at token {self._position}')
+            name = self._tokens[self._position].value
+            self._position += 1
+            if self._peek_value() == '=':
+                self._position += 1
+                next_value = self._parse_enum_value(known_values)
+
+            values.append((name, next_value))
+            known_values[name] = next_value
+            next_value += 1
+            if self._peek_value() == ',':
+                self._position += 1
+            elif self._peek_value() != '}':
+                raise ParsingError(f'Expected "," or "}}" in enum, found {self._peek_value()!r}')
+
+        self._position += 1
+        if self._peek_kind() != 'identifier':
+            raise ParsingError(f'Expected enum type name at token {self._position}')
+        name = self._tokens[self._position].value
+        self._position += 1
+        self._expect(';')
+        return EnumDeclaration(name, values)
+
+    def _parse_enum_value(self, known_values):
+        # Only literals and references to preceding enumerators, which is all libindy uses
+        sign = 1
+        if self._peek_value() == '-':
+            sign = -1
+            self._position += 1
+
+        value = self._peek_value()
+        self._position += 1
+        if value in known_values:
+            return sign * known_values[value]
+        try:
+            return sign * int(value.rstrip('uUlL'), 0)
+        except (AttributeError, ValueError):
+            raise ParsingError(f'Unsupported enum value {value!r} at token {self._position - 1}') from None
+
+    def _skip_statement(self):
+        depth = 0
+        tokens = self._tokens
+        while self._position < len(tokens):
+            value = tokens[self._position].value
+            self._position += 1
+            if value in ('{', '('):
+                depth += 1
+            elif value in ('}', ')'):
+                depth -= 1
+            elif value == ';' and depth == 0:
+                return
 
-    for scrape_result in _HEADER_FUNCTION_PATT.finditer(header_file_content):
-        declaration = parse_indy_function_declaration(scrape_result.groupdict()['declaration'])
-        declarations.append(declaration)
 
-    type_map = {}
+def scrape_header_file(header_file_content):
+    # Returns (declarations, type_map, enums)
+    parser = _Parser(header_file_content)
+    declarations, type_map = parser.parse_header()
+    return declarations, type_map, parser.enums
 
-    for scrape_result in _HEADER_TYPEDEF_PATT.finditer(header_file_content):
-        alias, c_type = parse_indy_typedef(scrape_result.groupdict()['types'])
-        type_map[alias] = c_type
 
-    return declarations, type_map
+def scrape_header_types(header_file_content):
+    # Typedefs and enums only, for a cheap pre-scan of headers whose declarations are scraped later
+    parser = _Parser(header_file_content)
+    _, type_map = parser.parse_header(typedefs_only=True)
+    return type_map, parser.enums
 
 
 def parse_indy_typedef(types_string):
-    types_string = re.sub(_MULTI_SPACE_PATT, ' ', types_string)
-    items = [item for item in types_string.split(' ') if item]
-
-    indy_alias = items[-1]
-    c_type = ' '.join(items[:-1])
-
-    return indy_alias, c_type
+    return _Parser(types_string).parse_typedef()
 
 
 def parse_indy_function_declaration(declaration):
-    function_name, return_type, parameters = _parse_function_declaration(declaration)
-    return FunctionDeclaration(function_name, return_type, parameters)
-
-
-def _parse_function_declaration(declaration):
-    declaration = declaration.strip()
-    declaration = declaration.translate(_REPLACEMENT_TABLE)
-    declaration = re.sub(_MULTI_SPACE_PATT, ' ', declaration)
-    scrape_result = _FUNCTION_DECLARATION_PATT.match(declaration)
-    if not scrape_result:
-        raise ParsingError(f'Failed to match function declaration {declaration}')
-
-    result_items = scrape_result.groupdict()
-    return_type = result_items['rtype']
-    function_name = result_items['fname'].replace('indy_', '', 1)
-    param_string = result_items['param_string'].strip(' ')
-
-    parameters = _parse_function_parameters(param_string)
-
-    return function_name, return_type, parameters
+    return _Parser(declaration).parse_declaration()
 
 
 def _parse_function_parameters(parameters_string):
-    parameter_strings = _split_parameter_string(parameters_string)
-    parameters = []
-
-    for param_string in parameter_strings:
-        parameters.append(_parse_parameter(param_string))
-
-    return parameters
-
-
-# NOTE - assumes one level of nesting
-def _split_parameter_string(parameters_string):
-    parameter_strings = []
-    nested = False
-    param_start = 0
-
-    for i in range(len(parameters_string)):
-        current_char = parameters_string[i]
-
-        if current_char == ',':
-            if i == param_start:
-                raise ParsingError(f'Invalid parameters string: {parameters_string}')
-
-            if nested:
-                continue
-
-            current_param_string = parameters_string[param_start:i].strip()
-            if not current_param_string:
-                raise ParsingError(f'Invalid parameters string: {parameters_string}')
-
-            parameter_strings.append(current_param_string)
-            param_start = i+1
-
-        elif current_char == '(':
-            nested = True
-        elif current_char == ')':
-            nested = False
-
-    last_param_string = parameters_string[param_start:].strip()
-    if not last_param_string:
-        raise ParsingError(f'Invalid parameters string: {parameters_string}')
-
-    parameter_strings.append(last_param_string)
-
-    return parameter_strings
-
-
-def _parse_parameter(parameter_string):
-    if _is_function_parameter(parameter_string):
-        return _parse_callback_parameter(parameter_string)
-
-    parts = parameter_string.split(' ')
-    if len(parts) < 2:
-        raise ParsingError(f'Invalid function parameter string: {parameter_string}')
-
-    param_name = parts[-1]
-    param_type = ' '.join(parts[:-1])
-    return FunctionParameter(param_name, param_type)
-
-
-def _is_function_parameter(parameter_string):
-    return '(' in parameter_string
-
-
-def _parse_callback_parameter(parameter_string):
-    name, return_type, parameters = _parse_function_declaration(parameter_string + ';')
-    return CallbackDeclaration(name, return_type, parameters)
-
+    return _Parser(f'({parameters_string})').parse_parameter_list()
@@ -0,0 +1,123 @@
+import cProfile
+import heapq
+import json
+import time
+from contextlib import contextmanager
+
+
+PHASE_READING = 'reading'
+PHASE_SCRAPING = 'scraping'
+PHASE_TYPEDEF_MERGE = 'typedef_merge'
+PHASE_ALIAS_RESOLUTION = 'alias_resolution'
+PHASE_GO_MODEL_CONSTRUCTION = 'go_model_construction'
+PHASE_EMISSION = 'emission'
+PHASE_FILE_WRITES = 'file_writes'
+
+
+class NullProfile:
+    # Instrumentation hook used when profiling is disabled - every method is a no-op
+    enabled = False
+
+    @contextmanager
+    def session(self):
+        yield
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def record(self, name, seconds, calls=1, bytes_produced=0):
+        pass
+
+    def record_declaration(self, file_name, declaration_name, seconds):
+        pass
+
+    def merge(self, other):
+        pass
+
+    def create_worker_profile(self):
+        return self
+
+
+class GenerationProfile(NullProfile):
+    enabled = True
+
+    def __init__(self, slowest_declarations_count=10, cprofile_path=None):
+        self.phases = {}
+        self.total_seconds = 0.0
+        self._slowest_declarations_count = slowest_declarations_count
+        self._slowest_declarations = []
+        self._cprofile_path = cprofile_path
+
+    @contextmanager
+    def session(self):
+        profiler = cProfile.Profile() if self._cprofile_path else None
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(self._cprofile_path)
+            self.total_seconds += time.perf_counter() - start
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds, calls=1, bytes_produced=0):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = {'seconds': 0.0, 'calls': 0, 'bytes': 0}
+        phase['seconds'] += seconds
+        phase['calls'] += calls
+        phase['bytes'] += bytes_produced
+
+    def record_declaration(self, file_name, declaration_name, seconds):
+        item = (seconds, file_name, declaration_name)
+        if len(self._slowest_declarations) < self._slowest_declarations_count:
+            heapq.heappush(self._slowest_declarations, item)
+        elif item > self._slowest_declarations[0]:
+            heapq.heapreplace(self._slowest_declarations, item)
+
+    def create_worker_profile(self):
+        # Worker processes record into their own profile, which is merged back after the run
+        return GenerationProfile(self._slowest_declarations_count)
+
+    def merge(self, other):
+        for name, phase in other.phases.items():
+            self.record(name, phase['seconds'], phase['calls'], phase['bytes'])
+        for seconds, file_name, declaration_name in other._slowest_declarations:
+            self.record_declaration(file_name, declaration_name, seconds)
+
+    def report(self):
+        slowest_declarations = sorted(self._slowest_declarations, reverse=True)
+        return {
+            'total_seconds': self.total_seconds,
+            'phases': {name: dict(phase) for name, phase in self.phases.items()},
+            'slowest_declarations': [{'file': file_name, 'name': declaration_name, 'seconds': seconds}
+                                     for seconds, file_name, declaration_name in slowest_declarations],
+        }
+
+    def write_report(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+
+
+class ProfiledSink:
+    # Wraps an output sink to account time spent and bytes produced by writes
+    def __init__(self, sink, profile):
+        self._sink = sink
+        self._profile = profile
+
+    def write(self, data):
+        start = time.perf_counter()
+        result = self._sink.write(data)
+        self._profile.record(PHASE_FILE_WRITES, time.perf_counter() - start, bytes_produced=len(data))
+        return result
@@ -0,0 +1,735 @@
+RUNTIME_FILE_NAME = 'indy_runtime.go'
+
+# Support code shared by all generated files. Libindy symbols are resolved with dlsym once per header, on first use
+# of any of its functions, and command handle registration is kept separate from symbol lookup
+GO_RUNTIME_CODE = """package indy
+
+/*
+#cgo LDFLAGS: -ldl
+#include <dlfcn.h>
+#include <stdlib.h>
+*/
+import "C"
+
+import (
+	"errors"
+	"fmt"
+	"math/rand"
+	"sync"
+	"sync/atomic"
+	"unsafe"
+)
+
+// LibraryPath is the shared library libindy symbols are resolved from. It has to be set before the first call
+var LibraryPath = "libindy.so"
+
+// ErrFutureWaited is returned by Wait of a future that was already waited on
+var ErrFutureWaited = errors.New("Future was already waited on")
+
+var (
+	libraryOnce   sync.Once
+	libraryHandle unsafe.Pointer
+	libraryErr    error
+)
+
+func openLibrary() (unsafe.Pointer, error) {
+	libraryOnce.Do(func() {
+		path := C.CString(LibraryPath)
+		defer C.free(unsafe.Pointer(path))
+		libraryHandle = C.dlopen(path, C.RTLD_NOW|C.RTLD_GLOBAL)
+		if libraryHandle == nil {
+			libraryErr = fmt.Errorf("Failed to load %s: %s", LibraryPath, C.GoString(C.dlerror()))
+		}
+	})
+	return libraryHandle, libraryErr
+}
+
+type symbolTable struct {
+	once     sync.Once
+	names    []string
+	pointers []unsafe.Pointer
+	err      error
+}
+
+func newSymbolTable(names ...string) *symbolTable {
+	return &symbolTable{names: names}
+}
+
+func (t *symbolTable) load() {
+	handle, err := openLibrary()
+	if err != nil {
+		t.err = err
+		return
+	}
+
+	pointers := make([]unsafe.Pointer, len(t.names))
+	for i, name := range t.names {
+		cName := C.CString(name)
+		pointers[i] = C.dlsym(handle, cName)
+		C.free(unsafe.Pointer(cName))
+	}
+	t.pointers = pointers
+}
+
+func (t *symbolTable) symbol(index int) symbol {
+	return symbol{table: t, index: index}
+}
+
+type symbol struct {
+	table *symbolTable
+	index int
+}
+
+func (s symbol) Pointer() (unsafe.Pointer, error) {
+	s.table.once.Do(s.table.load)
+	if s.table.err != nil {
+		return nil, s.table.err
+	}
+
+	pointer := s.table.pointers[s.index]
+	if pointer == nil {
+		return nil, fmt.Errorf("Symbol %s not found in %s", s.table.names[s.index], LibraryPath)
+	}
+	return pointer, nil
+}
+
+// argumentArena is a single C allocation holding NUL terminated copies of all string arguments of a call. Arenas are
+// recycled through a bounded free list, so that steady state calls do not allocate C memory at all
+type argumentArena struct {
+	data unsafe.Pointer
+	size int
+	used int
+}
+
+const (
+	minArenaSize       = 256
+	maxPooledArenaSize = 64 * 1024
+)
+
+var arenaFreeList = make(chan *argumentArena, 64)
+
+func acquireArena(size int) *argumentArena {
+	select {
+	case arena := <-arenaFreeList:
+		if arena.size >= size {
+			arena.used = 0
+			return arena
+		}
+		C.free(arena.data)
+	default:
+	}
+
+	if size < minArenaSize {
+		size = minArenaSize
+	}
+	return &argumentArena{data: C.malloc(C.size_t(size)), size: size}
+}
+
+func releaseArena(arena *argumentArena) {
+	if arena.size <= maxPooledArenaSize {
+		select {
+		case arenaFreeList <- arena:
+			return
+		default:
+		}
+	}
+	C.free(arena.data)
+}
+
+func (a *argumentArena) cString(s string) *C.char {
+	if s == "" {
+		return nil
+	}
+
+	buffer := unsafe.Slice((*byte)(unsafe.Add(a.data, a.used)), len(s)+1)
+	copy(buffer, s)
+	buffer[len(s)] = 0
+	a.used += len(s) + 1
+	return (*C.char)(unsafe.Pointer(&buffer[0]))
+}
+
+// Command handles index a preallocated, sharded slot array: handle = generation | shard | slot. Registration claims
+// a free slot with a CAS, lookup from the callback is a direct index, and the generation bits reject stale handles
+const (
+	registryShardBits      = 4
+	registrySlotBits       = 10
+	registryShards         = 1 << registryShardBits
+	registrySlots          = 1 << registrySlotBits
+	registryGenerationBits = 31 - registryShardBits - registrySlotBits
+	registryGenerationMask = 1<<registryGenerationBits - 1
+)
+
+// Slot state is generation<<2 | status
+const (
+	slotFree uint32 = iota
+	slotReserved
+	slotReady
+	slotClaimed
+	slotStatusMask = 3
+)
+
+type callSlot struct {
+	state      atomic.Uint32
+	completion interface{}
+	_          [8]byte
+}
+
+type registryShard struct {
+	cursor atomic.Uint32
+	_      [60]byte
+	slots  [registrySlots]callSlot
+}
+
+type callRegistry struct {
+	shards [registryShards]registryShard
+}
+
+var resolver = new(callRegistry)
+
+func (r *callRegistry) RegisterCall(completion interface{}) (int32, error) {
+	firstShard := rand.Uint32()
+	for i := uint32(0); i < registryShards; i++ {
+		shardIndex := (firstShard + i) % registryShards
+		shard := &r.shards[shardIndex]
+		for attempt := 0; attempt < registrySlots; attempt++ {
+			slotIndex := shard.cursor.Add(1) % registrySlots
+			slot := &shard.slots[slotIndex]
+			state := slot.state.Load()
+			if state&slotStatusMask != slotFree {
+				continue
+			}
+			generation := state>>2 + 1
+			if !slot.state.CompareAndSwap(state, generation<<2|slotReserved) {
+				continue
+			}
+
+			slot.completion = completion
+			slot.state.Store(generation<<2 | slotReady)
+			handle := (generation&registryGenerationMask)<<(registryShardBits+registrySlotBits) |
+				shardIndex<<registrySlotBits | slotIndex
+			return int32(handle), nil
+		}
+	}
+	return 0, fmt.Errorf("Too many libindy calls in flight")
+}
+
+func (r *callRegistry) DeregisterCall(commandHandle int32) (interface{}, error) {
+	handle := uint32(commandHandle)
+	slotIndex := handle % registrySlots
+	shardIndex := handle >> registrySlotBits % registryShards
+	generation := handle >> (registryShardBits + registrySlotBits)
+	slot := &r.shards[shardIndex].slots[slotIndex]
+
+	// Claimed first, so that only a single deregistration ever touches the completion
+	state := slot.state.Load()
+	if commandHandle < 0 || state&slotStatusMask != slotReady || state>>2&registryGenerationMask != generation ||
+		!slot.state.CompareAndSwap(state, state&^slotStatusMask|slotClaimed) {
+		return nil, fmt.Errorf("Unknown command handle: %d", commandHandle)
+	}
+
+	completion := slot.completion
+	slot.completion = nil
+	slot.state.Store(state&^slotStatusMask | slotFree)
+	return completion, nil
+}
+"""
+
+
+REGISTRY_TEST_FILE_NAME = 'indy_registry_test.go'
+
+# Tests of the lock free command handle registry of the runtime, meant to be run with -race as well
+GO_REGISTRY_TEST_CODE = """package indy
+
+import (
+	"sync"
+	"testing"
+)
+
+func TestCallRegistryConcurrentRegistration(t *testing.T) {
+	// Together the goroutines hold most slots at once, so that they keep contending for the same ones
+	const goroutines = 8
+	const batchSize = registryShards * registrySlots * 3 / 4 / goroutines
+	registry := new(callRegistry)
+	var wg sync.WaitGroup
+	for g := 0; g < goroutines; g++ {
+		wg.Add(1)
+		go func(g int) {
+			defer wg.Done()
+			handles := make([]int32, batchSize)
+			for round := 0; round < 20; round++ {
+				for i := range handles {
+					handle, err := registry.RegisterCall(g<<20 | i)
+					if err != nil {
+						t.Error(err)
+						return
+					}
+					handles[i] = handle
+				}
+				for i, handle := range handles {
+					completion, err := registry.DeregisterCall(handle)
+					if err != nil || completion != g<<20|i {
+						t.Errorf("Handle %d deregistered %v (%v), expected %d", handle, completion, err, g<<20|i)
+						return
+					}
+					if _, err := registry.DeregisterCall(handle); err == nil {
+						t.Errorf("Handle %d deregistered twice", handle)
+						return
+					}
+				}
+			}
+		}(g)
+	}
+	wg.Wait()
+}
+
+func TestCallRegistryFull(t *testing.T) {
+	registry := new(callRegistry)
+	handles := make(map[int32]int, registryShards*registrySlots)
+	for i := 0; i < registryShards*registrySlots; i++ {
+		handle, err := registry.RegisterCall(i)
+		if err != nil {
+			t.Fatalf("Registration %d failed: %v", i, err)
+		}
+		if _, ok := handles[handle]; ok {
+			t.Fatalf("Handle %d handed out twice", handle)
+		}
+		handles[handle] = i
+	}
+
+	if _, err := registry.RegisterCall(-1); err == nil {
+		t.Fatal("Registered a call in a full registry")
+	}
+
+	for handle, value := range handles {
+		if completion, err := registry.DeregisterCall(handle); err != nil || completion != value {
+			t.Fatalf("Handle %d deregistered %v (%v), expected %d", handle, completion, err, value)
+		}
+	}
+	handle, err := registry.RegisterCall(0)
+	if err != nil {
+		t.Fatalf("Registration after draining the registry failed: %v", err)
+	}
+	if _, ok := handles[handle]; ok {
+		t.Fatalf("Stale handle %d handed out again", handle)
+	}
+}
+
+func TestCallRegistryRejectsUnknownHandles(t *testing.T) {
+	registry := new(callRegistry)
+	for _, handle := range []int32{-1, 0, 1 << 20} {
+		if _, err := registry.DeregisterCall(handle); err == nil {
+			t.Errorf("Deregistered unknown handle %d", handle)
+		}
+	}
+}
+"""
+
+
+INSTRUMENTATION_FILE_NAME = 'indy_instrumentation.go'
+
+# Emitted only for instrumented builds, so that uninstrumented bindings carry no trace of it
+GO_INSTRUMENTATION_CODE = """package indy
+
+import (
+	"math/bits"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+// CallHooks receives events of every libindy call. CallSubmitted is invoked on the calling goroutine once libindy
+// accepted or rejected a call, CallCollected once the result of an accepted call was collected. Hooks have to be cheap
+// and safe for concurrent use
+type CallHooks interface {
+	CallSubmitted(function string, submitLatency time.Duration, resCode int32)
+	CallCollected(function string, callbackLatency time.Duration, errorCode int32)
+}
+
+type hooksHolder struct {
+	hooks CallHooks
+}
+
+var callHooks atomic.Value
+
+// SetCallHooks installs hooks invoked on every call, in addition to the built in metrics. Nil removes them
+func SetCallHooks(hooks CallHooks) {
+	callHooks.Store(hooksHolder{hooks})
+}
+
+func currentHooks() CallHooks {
+	holder, _ := callHooks.Load().(hooksHolder)
+	return holder.hooks
+}
+
+var processStart = time.Now()
+
+func monotonicNow() int64 {
+	return int64(time.Since(processStart))
+}
+
+// Bucket i counts latencies below 2^i microseconds, the last one everything above
+const LatencyBuckets = 24
+
+type latencyHistogram struct {
+	buckets [LatencyBuckets]atomic.Int64
+}
+
+func (h *latencyHistogram) observe(latency int64) {
+	bucket := bits.Len64(uint64(latency / int64(time.Microsecond)))
+	if bucket >= LatencyBuckets {
+		bucket = LatencyBuckets - 1
+	}
+	h.buckets[bucket].Add(1)
+}
+
+func (h *latencyHistogram) snapshot() []int64 {
+	counts := make([]int64, LatencyBuckets)
+	for i := range h.buckets {
+		counts[i] = h.buckets[i].Load()
+	}
+	return counts
+}
+
+// LatencyBucketBound returns the exclusive upper bound of given histogram bucket
+func LatencyBucketBound(bucket int) time.Duration {
+	return time.Duration(1<<uint(bucket)) * time.Microsecond
+}
+
+type callMetrics struct {
+	function        string
+	calls           atomic.Int64
+	inFlight        atomic.Int64
+	submitLatency   latencyHistogram
+	callbackLatency latencyHistogram
+	errorCodes      sync.Map
+}
+
+var (
+	allCallMetricsMutex sync.Mutex
+	allCallMetrics      []*callMetrics
+)
+
+func newCallMetrics(function string) *callMetrics {
+	metrics := &callMetrics{function: function}
+	allCallMetricsMutex.Lock()
+	allCallMetrics = append(allCallMetrics, metrics)
+	allCallMetricsMutex.Unlock()
+	return metrics
+}
+
+func (m *callMetrics) countError(errorCode int32) {
+	if errorCode == 0 {
+		return
+	}
+	counter, ok := m.errorCodes.Load(errorCode)
+	if !ok {
+		counter, _ = m.errorCodes.LoadOrStore(errorCode, new(atomic.Int64))
+	}
+	counter.(*atomic.Int64).Add(1)
+}
+
+func (m *callMetrics) submitted(started int64, resCode int32) {
+	latency := monotonicNow() - started
+	m.calls.Add(1)
+	if resCode == 0 {
+		m.inFlight.Add(1)
+	}
+	m.submitLatency.observe(latency)
+	m.countError(resCode)
+	if hooks := currentHooks(); hooks != nil {
+		hooks.CallSubmitted(m.function, time.Duration(latency), resCode)
+	}
+}
+
+// completed runs on the libindy callback thread
+func (m *callMetrics) completed(errorCode int32) {
+	m.inFlight.Add(-1)
+	m.countError(errorCode)
+}
+
+func (m *callMetrics) collected(started int64, completed int64, errorCode int32) {
+	latency := completed - started
+	m.callbackLatency.observe(latency)
+	if hooks := currentHooks(); hooks != nil {
+		hooks.CallCollected(m.function, time.Duration(latency), errorCode)
+	}
+}
+
+// CallStats is a point in time copy of the metrics of a single libindy function
+type CallStats struct {
+	Function        string
+	Calls           int64
+	InFlight        int64
+	SubmitLatency   []int64
+	CallbackLatency []int64
+	ErrorCodes      map[int32]int64
+}
+
+// CallMetrics returns stats of every libindy function called so far
+func CallMetrics() []CallStats {
+	allCallMetricsMutex.Lock()
+	metrics := append([]*callMetrics(nil), allCallMetrics...)
+	allCallMetricsMutex.Unlock()
+
+	stats := make([]CallStats, 0, len(metrics))
+	for _, m := range metrics {
+		calls := m.calls.Load()
+		if calls == 0 {
+			continue
+		}
+		errorCodes := make(map[int32]int64)
+		m.errorCodes.Range(func(key, value interface{}) bool {
+			errorCodes[key.(int32)] = value.(*atomic.Int64).Load()
+			return true
+		})
+		stats = append(stats, CallStats{
+			Function:        m.function,
+			Calls:           calls,
+			InFlight:        m.inFlight.Load(),
+			SubmitLatency:   m.submitLatency.snapshot(),
+			CallbackLatency: m.callbackLatency.snapshot(),
+			ErrorCodes:      errorCodes,
+		})
+	}
+	return stats
+}
+"""
+
+
+RING_FILE_NAME = 'indy_ring.go'
+RING_C_HEADER_FILE_NAME = 'indy_ring.h'
+RING_C_FILE_NAME = 'indy_ring.c'
+
+# Emitted only with ring delivery (Linux only, needs eventfd). Generated C callbacks copy results into ring entries,
+# so that libindy threads never enter Go
+RING_C_HEADER_CODE = """#ifndef INDY_RING_H
+#define INDY_RING_H
+
+#include <stdint.h>
+
+#define INDY_RING_MAX_VALUES 8
+
+typedef struct indy_ring_value {
+    void *data;
+    int64_t number;
+    uint32_t length;
+} indy_ring_value;
+
+typedef struct indy_ring_entry {
+    int32_t command_handle;
+    int32_t err;
+    indy_ring_value values[INDY_RING_MAX_VALUES];
+} indy_ring_entry;
+
+int indy_ring_open(void);
+void indy_ring_push(const indy_ring_entry *entry);
+int indy_ring_drain(indy_ring_entry *entries, int max_entries, int released_entries);
+void *indy_ring_copy_string(const char *s);
+void *indy_ring_copy_bytes(const void *data, uint32_t length);
+
+#endif
+"""
+
+# Bounded MPSC queue with a sequence number per cell (after Vyukov's bounded queue). Producers claim cells with a CAS
+# and wait for the drainer when the ring is full. The drainer announces that it is about to sleep before its final
+# emptiness check, and producers that see the announcement wake it through the eventfd
+RING_C_CODE = """#include <sched.h>
+#include <stdatomic.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/eventfd.h>
+#include <unistd.h>
+
+#include "indy_ring.h"
+
+#define INDY_RING_SIZE 1024
+
+typedef struct {
+    atomic_size_t sequence;
+    indy_ring_entry entry;
+} indy_ring_cell;
+
+static indy_ring_cell indy_ring_cells[INDY_RING_SIZE];
+static atomic_size_t indy_ring_enqueue_position;
+static size_t indy_ring_dequeue_position;
+static atomic_int indy_ring_sleeping;
+static int indy_ring_eventfd = -1;
+
+int indy_ring_open(void) {
+    for (size_t i = 0; i < INDY_RING_SIZE; i++) {
+        atomic_store_explicit(&indy_ring_cells[i].sequence, i, memory_order_relaxed);
+    }
+    indy_ring_eventfd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+    return indy_ring_eventfd;
+}
+
+static void indy_ring_wake(void) {
+    atomic_thread_fence(memory_order_seq_cst);
+    if (atomic_exchange_explicit(&indy_ring_sleeping, 0, memory_order_seq_cst)) {
+        uint64_t one = 1;
+        ssize_t written = write(indy_ring_eventfd, &one, sizeof(one));
+        (void)written;
+    }
+}
+
+void indy_ring_push(const indy_ring_entry *entry) {
+    size_t position = atomic_load_explicit(&indy_ring_enqueue_position, memory_order_relaxed);
+    indy_ring_cell *cell;
+    for (;;) {
+        cell = &indy_ring_cells[position % INDY_RING_SIZE];
+        size_t sequence = atomic_load_explicit(&cell->sequence, memory_order_acquire);
+        intptr_t difference = (intptr_t)sequence - (intptr_t)position;
+        if (difference == 0) {
+            if (atomic_compare_exchange_weak_explicit(&indy_ring_enqueue_position, &position, position + 1,
+                                                      memory_order_relaxed, memory_order_relaxed)) {
+                break;
+            }
+        } else if (difference < 0) {
+            // Full - only the drainer frees cells
+            indy_ring_wake();
+            sched_yield();
+            position = atomic_load_explicit(&indy_ring_enqueue_position, memory_order_relaxed);
+        } else {
+            position = atomic_load_explicit(&indy_ring_enqueue_position, memory_order_relaxed);
+        }
+    }
+
+    cell->entry = *entry;
+    atomic_store_explicit(&cell->sequence, position + 1, memory_order_release);
+    indy_ring_wake();
+}
+
+static int indy_ring_ready(void) {
+    indy_ring_cell *cell = &indy_ring_cells[indy_ring_dequeue_position % INDY_RING_SIZE];
+    return atomic_load_explicit(&cell->sequence, memory_order_acquire) == indy_ring_dequeue_position + 1;
+}
+
+// Frees values of the previously drained batch, then copies out up to max_entries completions. Returns 0 only once
+// the drainer is announced as sleeping and the ring is still empty, so that the next push wakes it
+int indy_ring_drain(indy_ring_entry *entries, int max_entries, int released_entries) {
+    for (int i = 0; i < released_entries; i++) {
+        for (int j = 0; j < INDY_RING_MAX_VALUES; j++) {
+            free(entries[i].values[j].data);
+        }
+    }
+
+    int count = 0;
+    while (count < max_entries && indy_ring_ready()) {
+        indy_ring_cell *cell = &indy_ring_cells[indy_ring_dequeue_position % INDY_RING_SIZE];
+        entries[count++] = cell->entry;
+        atomic_store_explicit(&cell->sequence, indy_ring_dequeue_position + INDY_RING_SIZE, memory_order_release);
+        indy_ring_dequeue_position++;
+    }
+    if (count) {
+        return count;
+    }
+
+    atomic_store_explicit(&indy_ring_sleeping, 1, memory_order_seq_cst);
+    atomic_thread_fence(memory_order_seq_cst);
+    if (indy_ring_ready()) {
+        atomic_store_explicit(&indy_ring_sleeping, 0, memory_order_seq_cst);
+        return indy_ring_drain(entries, max_entries, 0);
+    }
+    return 0;
+}
+
+void *indy_ring_copy_string(const char *s) {
+    return s ? strdup(s) : NULL;
+}
+
+void *indy_ring_copy_bytes(const void *data, uint32_t length) {
+    if (!data || !length) {
+        return NULL;
+    }
+    void *copy = malloc(length);
+    if (copy) {
+        memcpy(copy, data, length);
+    }
+    return copy;
+}
+"""
+
+GO_RING_CODE = """package indy
+
+/*
+#include <stdlib.h>
+#include "indy_ring.h"
+*/
+import "C"
+
+import (
+	"fmt"
+	"os"
+	"sync"
+)
+
+// Completions are drained in batches of up to ringBatchSize entries per cgo call
+const ringBatchSize = 128
+
+type ringEntry C.indy_ring_entry
+
+// ringCompletion is registered instead of the bare completion channel of a ring delivered call
+type ringCompletion interface {
+	deliver(entry *ringEntry)
+}
+
+var (
+	ringOnce sync.Once
+	ringErr  error
+)
+
+func startRingDelivery() error {
+	ringOnce.Do(func() {
+		fd := C.indy_ring_open()
+		if fd < 0 {
+			ringErr = fmt.Errorf("Failed to create completion ring eventfd")
+			return
+		}
+		// Non blocking, so that reads park the drainer in the runtime poller instead of blocking a thread
+		go drainRing(os.NewFile(uintptr(fd), "indy_ring"))
+	})
+	return ringErr
+}
+
+func drainRing(events *os.File) {
+	entries := (*[ringBatchSize]C.indy_ring_entry)(C.malloc(C.sizeof_indy_ring_entry * ringBatchSize))
+	var counter [8]byte
+	released := 0
+	for {
+		count := int(C.indy_ring_drain(&entries[0], ringBatchSize, C.int(released)))
+		for i := 0; i < count; i++ {
+			entry := (*ringEntry)(&entries[i])
+			completion, err := resolver.DeregisterCall(int32(entry.command_handle))
+			if err != nil {
+				panic("Invalid handle in ring completion")
+			}
+			completion.(ringCompletion).deliver(entry)
+		}
+		released = count
+
+		if count == 0 {
+			if _, err := events.Read(counter[:]); err != nil {
+				panic(fmt.Sprintf("Failed to wait for ring completions: %v", err))
+			}
+		}
+	}
+}
+
+func (e *ringEntry) errorCode() int32 {
+	return int32(e.err)
+}
+
+func (e *ringEntry) stringValue(i int) string {
+	return C.GoString((*C.char)(e.values[i].data))
+}
+
+func (e *ringEntry) bytesValue(i int) []byte {
+	return C.GoBytes(e.values[i].data, C.int(e.values[i].length))
+}
+
+func (e *ringEntry) numberValue(i int) int64 {
+	return int64(e.values[i].number)
+}
+"""
@@ -0,0 +1,73 @@
+import os
+import re
+from fnmatch import fnmatchcase
+
+from indygo_generator.utils import to_camel_case
+
+
+class SelectionError(Exception):
+    pass
+
+
+# Narrows declarations down to the functions bindings are needed for. Patterns are matched against both the libindy
+# name (indy_crypto_sign) and the generated Go name (CryptoSign). A function is selected when it matches an include
+# pattern or is referenced in the scanned Go sources (any function, if neither is given), and no exclude pattern
+class FunctionSelection:
+    def __init__(self, include_patterns=(), exclude_patterns=(), go_source_path=None, ignored_paths=()):
+        self._include_patterns = list(include_patterns)
+        self._exclude_patterns = list(exclude_patterns)
+        self._go_source_path = go_source_path
+        self._ignored_paths = {os.path.abspath(path) for path in ignored_paths}
+
+    def select(self, c_function_declarations, referenced_names=None):
+        # Referenced names of a previous scan_go_sources() can be passed in, to select headers one at a time
+        if referenced_names is None:
+            referenced_names = self.scan_go_sources()
+        selected_declarations = {}
+        for file_name, declarations in c_function_declarations.items():
+            selected_declarations[file_name] = [declaration for declaration in declarations
+                                                if self._is_selected(declaration.name, referenced_names)]
+        return selected_declarations
+
+    def _is_selected(self, declaration_name, referenced_names):
+        names = (f'indy_{declaration_name}', _go_function_name(declaration_name))
+        if any(fnmatchcase(name, pattern) for name in names for pattern in self._exclude_patterns):
+            return False
+        if not self._include_patterns and referenced_names is None:
+            return True
+        if any(fnmatchcase(name, pattern) for name in names for pattern in self._include_patterns):
+            return True
+        return referenced_names is not None and (names[1] in referenced_names or
+                                                 names[1] + 'Async' in referenced_names)
+
+    def scan_go_sources(self):
+        # Over-approximates - any exported identifier spelled like a generated function counts as a reference
+        if not self._go_source_path:
+            return None
+
+        referenced_names = set()
+        try:
+            for dir_path, dir_names, file_names in os.walk(self._go_source_path, onerror=_raise):
+                dir_names[:] = [dir_name for dir_name in dir_names
+                                if os.path.abspath(os.path.join(dir_path, dir_name)) not in self._ignored_paths]
+                for file_name in file_names:
+                    if not file_name.endswith('.go'):
+                        continue
+                    with open(os.path.join(dir_path, file_name), 'r') as f:
+                        referenced_names.update(_EXPORTED_IDENTIFIER_PATT.findall(f.read()))
+        except OSError as e:
+            raise SelectionError(f'Failed to scan Go sources at path: {self._go_source_path}') from e
+        return referenced_names
+
+
+def _go_function_name(declaration_name):
+    name = to_camel_case(declaration_name)
+    return name[0].title() + name[1:]
+
+
+def _raise(error):
+    # os.walk silently skips unreadable directories otherwise
+    raise error
+
+
+_EXPORTED_IDENTIFIER_PATT = re.compile(r'\b[A-Z]\w*')
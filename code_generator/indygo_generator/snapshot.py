@@ -0,0 +1,81 @@
+import hashlib
+import os
+import pickle
+
+from indygo_generator.utils import package_fingerprint
+
+
+_SNAPSHOT_FORMAT_VERSION = 2
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+# Versioned binary snapshot of scraped (not yet alias resolved) declarations, typedefs and enums per header, keyed by
+# header content hash. Only load snapshots from trusted locations, since they are pickles
+class DeclarationSnapshot:
+    def __init__(self, path, salt=None):
+        self._path = path
+        self._salt = salt if salt is not None else package_fingerprint()
+        self._headers = {}
+        self._modified = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        try:
+            with open(self._path, 'rb') as f:
+                content = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            raise SnapshotError(f'Failed to load declaration snapshot at path: {self._path}') from e
+
+        if not isinstance(content, dict) or content.get('version') != _SNAPSHOT_FORMAT_VERSION \
+                or content.get('salt') != self._salt:
+            return
+
+        self._headers = content['headers']
+
+    def save(self):
+        if not self._modified:
+            return
+
+        content = {
+            'version': _SNAPSHOT_FORMAT_VERSION,
+            'salt': self._salt,
+            'headers': self._headers,
+        }
+        temp_path = self._path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path)
+            self._modified = False
+        except OSError as e:
+            raise SnapshotError(f'Failed to save declaration snapshot at path: {self._path}') from e
+
+    def get(self, file_name, header_hash):
+        entry = self._headers.get(file_name)
+        if entry is None or entry[0] != header_hash:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1], entry[2], entry[3]
+
+    def put(self, file_name, header_hash, declarations, type_map, enums):
+        self._headers[file_name] = (header_hash, declarations, type_map, enums)
+        self._modified = True
+
+    def retain(self, file_names):
+        # Drops headers which no longer exist
+        headers = {name: entry for name, entry in self._headers.items() if name in file_names}
+        if len(headers) != len(self._headers):
+            self._headers = headers
+            self._modified = True
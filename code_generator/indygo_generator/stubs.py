@@ -0,0 +1,270 @@
+import os
+
+from indygo_generator.types import CallbackDeclaration, GoFunction, pair_buffers, parse_c_type
+
+
+STUB_LIBRARY_FILE_NAME = os.path.join('stub', 'indy_stub.c')
+BENCHMARK_MAIN_FILE_NAME = 'indy_stub_main_test.go'
+
+
+def generate_stub_library_code(declarations):
+    # Every stub immediately "succeeds", calling the callback with canned results for each returned value
+    parts = [_STUB_LIBRARY_PREAMBLE]
+    for declaration in declarations:
+        parts.append(_generate_stub_function_code(declaration))
+    return '\n\n'.join(parts) + '\n'
+
+
+def generate_benchmark_code(declarations):
+    benchmarks = []
+    for declaration in declarations:
+        benchmark_code = _generate_benchmark_function_code(GoFunction.create_from_indy_declaration(declaration))
+        if benchmark_code:
+            benchmarks.append(benchmark_code)
+    if not benchmarks:
+        return None
+    return '\n\n'.join([_BENCHMARK_FILE_PREAMBLE] + benchmarks) + '\n'
+
+
+def _c_parameter(param):
+    if isinstance(param, CallbackDeclaration):
+        param_types = ', '.join(nested_param.type for nested_param in param.parameters)
+        return f'{param.return_type} (*{param.name})({param_types})'
+    return f'{param.type} {param.name}'
+
+
+def _canned_values(callback):
+    # Canned data is const, so it is cast to the (often non-const) parameter types of the callback
+    values = ['command_handle', '0']
+    for param, length_param in pair_buffers(callback.parameters[2:]):
+        c_type = parse_c_type(param.type)
+        if length_param:
+            values.extend([f'({param.type})stub_bytes', 'sizeof(stub_bytes)'])
+        elif c_type.spelling == 'char *':
+            values.append(f'({param.type})stub_json')
+        elif c_type.spelling == 'uint8_t *':
+            values.append(f'({param.type})stub_bytes')
+        elif c_type.pointer_depth:
+            values.append('NULL')
+        else:
+            values.append('1')
+    return values
+
+
+def _generate_stub_function_code(declaration):
+    callback = declaration.callback
+    completion_name = f'stub_complete_{declaration.name}'
+    completion_code = (f'static void {completion_name}(void *cb, int32_t command_handle) {{\n'
+                       f'    (({callback.type})cb)({", ".join(_canned_values(callback))});\n}}')
+
+    param_string = ', '.join(_c_parameter(param) for param in declaration.parameters)
+    command_handle_name = declaration.parameters[0].name
+    function_code = (f'{declaration.return_type} indy_{declaration.name}({param_string}) {{\n'
+                     f'    return stub_dispatch({completion_name}, (void *){callback.name}, {command_handle_name});\n}}')
+    return f'{completion_code}\n\n{function_code}'
+
+
+def _generate_benchmark_function_code(go_function):
+    arguments = []
+    for param in go_function.parameters:
+        argument = _BENCHMARK_ARGUMENTS.get(param.type)
+        if argument is None:
+            # No sensible canned value (e.g. Go callbacks) - such functions are left out of the suite
+            return None
+        arguments.append(argument)
+
+    returned_values = ', '.join(['_'] * (len(go_function.return_types) - 1) + ['err'])
+    return (f'func Benchmark{go_function.name}(b *testing.B) {{\n'
+            f'\tb.ReportAllocs()\n'
+            f'\tb.SetParallelism(benchmarkParallelism)\n'
+            f'\tb.RunParallel(func(pb *testing.PB) {{\n'
+            f'\t\tfor pb.Next() {{\n'
+            f'\t\t\tif {returned_values} := {go_function.name}({", ".join(arguments)}); err != nil {{\n'
+            f'\t\t\t\tb.Fatal(err)\n'
+            f'\t\t\t}}\n'
+            f'\t\t}}\n'
+            f'\t}})\n'
+            f'}}')
+
+
+_BENCHMARK_ARGUMENTS = {
+    'int32': '1',
+    'uint32': '1',
+    'int64': '1',
+    'uint64': '1',
+    'string': '"{}"',
+    '[]byte': 'benchmarkBytes',
+}
+
+
+_STUB_LIBRARY_PREAMBLE = """// Stub libindy, for measuring binding overhead without a real libindy and pool.
+// Built by the generated benchmarks, or manually with: cc -O2 -shared -fPIC -o libindy_stub.so indy_stub.c -lpthread
+//
+// INDY_STUB_MODE selects how callbacks are invoked:
+//   inline - before the call returns, on the calling thread (default)
+//   thread - from INDY_STUB_THREADS worker threads (default 1, like libindy's command thread)
+//   delay  - as thread, but INDY_STUB_DELAY_US (default 1000) microseconds after the call
+#include <pthread.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+typedef void (*stub_completion_t)(void *cb, int32_t command_handle);
+
+struct stub_call {
+    stub_completion_t complete;
+    void *cb;
+    int32_t command_handle;
+    struct stub_call *next;
+};
+
+enum { STUB_INLINE, STUB_THREAD, STUB_DELAY };
+
+static pthread_once_t stub_once = PTHREAD_ONCE_INIT;
+static int stub_mode = STUB_INLINE;
+static useconds_t stub_delay_us = 0;
+static pthread_mutex_t stub_mutex = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t stub_cond = PTHREAD_COND_INITIALIZER;
+static struct stub_call *stub_head = NULL;
+static struct stub_call *stub_tail = NULL;
+
+static const char stub_json[] = "{}";
+static const uint8_t stub_bytes[] = {1, 2, 3, 4, 5, 6, 7, 8};
+
+static void *stub_worker(void *arg) {
+    (void)arg;
+    for (;;) {
+        pthread_mutex_lock(&stub_mutex);
+        while (!stub_head) {
+            pthread_cond_wait(&stub_cond, &stub_mutex);
+        }
+        struct stub_call *call = stub_head;
+        stub_head = call->next;
+        if (!stub_head) {
+            stub_tail = NULL;
+        }
+        pthread_mutex_unlock(&stub_mutex);
+
+        if (stub_delay_us) {
+            usleep(stub_delay_us);
+        }
+        call->complete(call->cb, call->command_handle);
+        free(call);
+    }
+    return NULL;
+}
+
+static void stub_init(void) {
+    const char *mode = getenv("INDY_STUB_MODE");
+    const char *delay = getenv("INDY_STUB_DELAY_US");
+    const char *threads = getenv("INDY_STUB_THREADS");
+
+    if (mode && strcmp(mode, "thread") == 0) {
+        stub_mode = STUB_THREAD;
+    } else if (mode && strcmp(mode, "delay") == 0) {
+        stub_mode = STUB_DELAY;
+        stub_delay_us = delay ? (useconds_t)atoi(delay) : 1000;
+    }
+    if (stub_mode == STUB_INLINE) {
+        return;
+    }
+
+    int thread_count = threads ? atoi(threads) : 1;
+    if (thread_count < 1) {
+        thread_count = 1;
+    }
+    for (int i = 0; i < thread_count; i++) {
+        pthread_t thread;
+        pthread_create(&thread, NULL, stub_worker, NULL);
+        pthread_detach(thread);
+    }
+}
+
+static int32_t stub_dispatch(stub_completion_t complete, void *cb, int32_t command_handle) {
+    pthread_once(&stub_once, stub_init);
+    if (stub_mode == STUB_INLINE) {
+        complete(cb, command_handle);
+        return 0;
+    }
+
+    struct stub_call *call = malloc(sizeof(*call));
+    if (!call) {
+        return 1;
+    }
+    call->complete = complete;
+    call->cb = cb;
+    call->command_handle = command_handle;
+    call->next = NULL;
+
+    pthread_mutex_lock(&stub_mutex);
+    if (stub_tail) {
+        stub_tail->next = call;
+    } else {
+        stub_head = call;
+    }
+    stub_tail = call;
+    pthread_cond_signal(&stub_cond);
+    pthread_mutex_unlock(&stub_mutex);
+    return 0;
+}"""
+
+
+_BENCHMARK_FILE_PREAMBLE = 'package indy\n\nimport "testing"'
+
+
+# Builds the stub library unless INDY_STUB_LIBRARY points to one. INDY_BENCH_PARALLELISM sets goroutines per GOMAXPROCS
+GO_BENCHMARK_MAIN_CODE = """package indy
+
+import (
+	"fmt"
+	"os"
+	"os/exec"
+	"path/filepath"
+	"strconv"
+	"testing"
+)
+
+var benchmarkBytes = make([]byte, 256)
+
+var benchmarkParallelism = 1
+
+func TestMain(m *testing.M) {
+	if parallelism, err := strconv.Atoi(os.Getenv("INDY_BENCH_PARALLELISM")); err == nil && parallelism > 0 {
+		benchmarkParallelism = parallelism
+	}
+
+	library := os.Getenv("INDY_STUB_LIBRARY")
+	buildDir := ""
+	if library == "" {
+		var err error
+		buildDir, err = os.MkdirTemp("", "indy_stub")
+		if err != nil {
+			fmt.Fprintln(os.Stderr, "Failed to create stub build directory:", err)
+			os.Exit(1)
+		}
+		library = filepath.Join(buildDir, "libindy_stub.so")
+
+		compiler := os.Getenv("CC")
+		if compiler == "" {
+			compiler = "cc"
+		}
+		build := exec.Command(compiler, "-O2", "-shared", "-fPIC", "-o", library, filepath.Join("stub", "indy_stub.c"),
+			"-lpthread")
+		build.Stdout = os.Stderr
+		build.Stderr = os.Stderr
+		if err := build.Run(); err != nil {
+			fmt.Fprintln(os.Stderr, "Failed to build stub library:", err)
+			os.RemoveAll(buildDir)
+			os.Exit(1)
+		}
+	}
+	LibraryPath = library
+
+	code := m.Run()
+	if buildDir != "" {
+		os.RemoveAll(buildDir)
+	}
+	os.Exit(code)
+}
+"""
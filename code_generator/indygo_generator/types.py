@@ -1,3 +1,7 @@
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
 from indygo_generator.utils import to_camel_case
 
 
@@ -23,6 +27,8 @@ _C_TO_GO_TYPE_MAP = {
 
 _C_TO_CGO_TYPE_MAP = {
     'char *': '*C.char',
+    'uint8_t *': '*C.uint8_t',
+    'indy_u8_t *': '*C.uint8_t',
 }
 
 
@@ -31,7 +37,13 @@ _CGO_TO_GO_CONVERSIONS = {
 }
 
 
+# (const uint8_t *data, uint32_t len) pairs are exposed as a single []byte
+_BUFFER_DATA_TYPES = {'uint8_t *', 'indy_u8_t *'}
+_BUFFER_LENGTH_TYPES = {'uint32_t', 'indy_u32_t'}
+
+
 _GO_TO_CGO_TYPE_MAP = {
+    '[]byte': '*C.uint8_t',
     'string': '*C.char',
     'int32': 'C.int32_t',
     'uint32': 'C.uint32_t',
@@ -47,6 +59,7 @@ _GO_TO_CGO_CONVERSIONS = {
 
 
 _DEFAULT_GO_VALUES = {
+    '[]byte': 'nil',
     'string': '\"\"',
     'int32': '0',
     'uint32': '0',
@@ -57,21 +70,61 @@ _DEFAULT_GO_VALUES = {
 # Note - this is not strictly CGo, since integers are same
 _CGO_TO_C_TYPE_MAP = {
     '*C.char': 'char *',
+    '*C.uint8_t': 'uint8_t *',
     'int32': 'int32_t',
     'uint32': 'uint32_t',
     'int32_t': 'int32',
 }
 
 
+# Canonical record of a C type string. Spelling is the normalized form ('char *' for 'const char*', 'char*', ...)
+CType = namedtuple('CType', ['base', 'pointer_depth', 'is_const', 'spelling', 'go_type', 'cgo_type'])
+
+
+def _canonical_spelling(base, pointer_depth):
+    if not pointer_depth:
+        return base
+    return base + ' ' + '*' * pointer_depth
+
+
+def _parse_c_type_words(c_type):
+    words = c_type.replace('*', ' * ').split()
+    pointer_depth = words.count('*')
+    is_const = 'const' in words
+    base = ' '.join(word for word in words if word != '*' and word != 'const')
+    return base, pointer_depth, is_const
+
+
+def _normalize_type_map(type_map):
+    return {_canonical_spelling(*_parse_c_type_words(c_type)[:2]): mapped for c_type, mapped in type_map.items()}
+
+
+_C_TO_GO_TYPE_MAP = _normalize_type_map(_C_TO_GO_TYPE_MAP)
+_C_TO_CGO_TYPE_MAP = _normalize_type_map(_C_TO_CGO_TYPE_MAP)
+
+
+@lru_cache(maxsize=None)
+def parse_c_type(c_type):
+    # Each distinct type string is parsed once, with its Go and cgo mappings looked up ahead of time
+    base, pointer_depth, is_const = _parse_c_type_words(c_type)
+    spelling = _canonical_spelling(base, pointer_depth)
+    go_type = _C_TO_GO_TYPE_MAP.get(spelling)
+    cgo_type = _C_TO_CGO_TYPE_MAP.get(spelling, go_type)
+    return CType(base, pointer_depth, is_const, spelling, go_type, cgo_type)
+
+
 def get_go_type(c_type):
-    c_type = c_type.replace('const', '').strip()
-    return _C_TO_GO_TYPE_MAP[c_type]
+    go_type = parse_c_type(c_type).go_type
+    if go_type is None:
+        raise KeyError(c_type)
+    return go_type
 
 
 def get_cgo_type(c_type):
-    c_type = c_type.replace('const', '').strip()
-    cgo_type = _C_TO_CGO_TYPE_MAP.get(c_type)
-    return cgo_type or _C_TO_GO_TYPE_MAP[c_type]
+    cgo_type = parse_c_type(c_type).cgo_type
+    if cgo_type is None:
+        raise KeyError(c_type)
+    return cgo_type
 
 
 def get_cgo_type_for_go_type(go_type):
@@ -96,20 +149,107 @@ def get_c_type_for_cgo_type(cgo_type):
     return _CGO_TO_C_TYPE_MAP[cgo_type]
 
 
-class FunctionParameter:
-    def __init__(self, name, type):
-        self.name = name
-        self.type = type
+class TypeGraphError(Exception):
+    pass
 
-    def resolve_alias(self, type_map):
-        queried_type = self.type.replace('const', '').strip()
-        pointer_level = queried_type.count('*')
-        queried_type = queried_type.replace('*', '').strip()
-        aliased_type = type_map.get(queried_type)
-        if not aliased_type:
-            return
 
-        self.type = aliased_type + ' ' + '*' * pointer_level
+# Typedef aliases of all headers, resolved transitively once: every alias maps to the (canonically spelled) type at
+# the end of its chain, so that indy_handle_t -> indy_i32_t -> int32_t resolves like a direct alias
+class TypeGraph:
+    def __init__(self, type_map):
+        self._type_map = type_map
+        self.aliases = {}
+        for alias in type_map:
+            self._resolve(alias, ())
+        self.resolved = ResolvedTypes(self.aliases)
+
+    def _resolve(self, alias, path):
+        resolved_type = self.aliases.get(alias)
+        if resolved_type is not None:
+            return resolved_type
+        if alias in path:
+            raise TypeGraphError(f'Cyclic typedef: {" -> ".join(path + (alias,))}')
+
+        c_type = parse_c_type(self._type_map[alias])
+        resolved_type = c_type.spelling
+        if c_type.base in self._type_map:
+            aliased_c_type = parse_c_type(self._resolve(c_type.base, path + (alias,)))
+            resolved_type = _canonical_spelling(aliased_c_type.base,
+                                                aliased_c_type.pointer_depth + c_type.pointer_depth)
+        self.aliases[alias] = resolved_type
+        return resolved_type
+
+
+# Lookup table of type string -> type string with aliases resolved, filled on the first lookup of each distinct type
+class ResolvedTypes(dict):
+    def __init__(self, aliases):
+        super().__init__()
+        self._aliases = aliases
+
+    def __missing__(self, c_type):
+        parsed_c_type = parse_c_type(c_type)
+        aliased_type = self._aliases.get(parsed_c_type.base)
+        resolved_type = c_type
+        if aliased_type:
+            aliased_c_type = parse_c_type(aliased_type)
+            resolved_type = _canonical_spelling(aliased_c_type.base,
+                                                aliased_c_type.pointer_depth + parsed_c_type.pointer_depth)
+        self[c_type] = resolved_type
+        return resolved_type
+
+
+def _resolved_types(type_map):
+    # Plain typedef maps are accepted too, at the cost of building a graph per call
+    if isinstance(type_map, ResolvedTypes):
+        return type_map
+    return TypeGraph(type_map).resolved
+
+
+def _is_buffer(data_param, length_param):
+    if isinstance(data_param, CallbackDeclaration) or isinstance(length_param, CallbackDeclaration):
+        return False
+    return (parse_c_type(data_param.type).spelling in _BUFFER_DATA_TYPES and
+            parse_c_type(length_param.type).spelling in _BUFFER_LENGTH_TYPES)
+
+
+def pair_buffers(params):
+    # Yields (param, length param) pairs, with length param being None for anything but buffers
+    i = 0
+    while i < len(params):
+        if i + 1 < len(params) and _is_buffer(params[i], params[i + 1]):
+            yield params[i], params[i + 1]
+            i += 2
+        else:
+            yield params[i], None
+            i += 1
+
+
+_interned_tuples = {}
+
+
+def _intern_tuple(items):
+    # Identical signatures (e.g. the ubiquitous (handle, err, json) callback) share a single tuple
+    items = tuple(items)
+    return _interned_tuples.setdefault(items, items)
+
+
+def clear_interned_tuples():
+    # Called at the start of every generator run, so that long running processes (watch mode) do not keep the
+    # signatures of every run alive. Declarations kept from earlier runs stay valid, they just share less
+    _interned_tuples.clear()
+
+
+class FunctionParameter(namedtuple('FunctionParameter', ['name', 'type'])):
+    __slots__ = ()
+
+    def __new__(cls, name, type):
+        return super().__new__(cls, sys.intern(name), sys.intern(type))
+
+    def resolve_alias(self, type_map):
+        resolved_type = _resolved_types(type_map)[self.type]
+        if resolved_type == self.type:
+            return self
+        return FunctionParameter(self.name, resolved_type)
 
     def __repr__(self):
         return str(self)
@@ -118,19 +258,20 @@ class FunctionParameter:
         return f'{self.type} {self.name}'
 
 
-class CallbackDeclaration:
-    def __init__(self, name, return_type, parameters):
-        self.return_type = return_type
-        self.parameters = parameters
-        self.name = name
+class CallbackDeclaration(namedtuple('CallbackDeclaration', ['name', 'return_type', 'parameters'])):
+    __slots__ = ()
+
+    def __new__(cls, name, return_type, parameters):
+        return super().__new__(cls, sys.intern(name), sys.intern(return_type), _intern_tuple(parameters))
 
     def resolve_alias(self, type_map):
-        self.return_type = type_map.get(self.return_type, self.return_type)
-        for param in self.parameters:
-            param.resolve_alias(type_map)
+        resolved_types = _resolved_types(type_map)
+        return CallbackDeclaration(self.name, resolved_types[self.return_type],
+                                   [param.resolve_alias(resolved_types) for param in self.parameters])
 
     def get_go_type_as_string(self):
-        go_param_types = [get_go_type(param.type) for param in self.parameters]
+        go_param_types = [param.get_go_type_as_string() if isinstance(param, CallbackDeclaration) else get_go_type(param.type)
+                          for param in self.parameters]
         go_return_type = get_go_type(self.return_type)
         return f'func ({", ".join(go_param_types)}) ({go_return_type})'
 
@@ -145,17 +286,16 @@ class CallbackDeclaration:
         return f'{self.return_type} (*cb)({", ".join(str(param) for param in self.parameters)})'
 
 
-class FunctionDeclaration:
-    def __init__(self, name, return_type, parameters):
-        self.name = name
-        self.return_type = return_type
-        self.parameters = parameters
+class FunctionDeclaration(namedtuple('FunctionDeclaration', ['name', 'return_type', 'parameters'])):
+    __slots__ = ()
 
-    def resolve_alias(self, type_map):
-        self.return_type = type_map.get(self.return_type, self.return_type)
+    def __new__(cls, name, return_type, parameters):
+        return super().__new__(cls, sys.intern(name), sys.intern(return_type), tuple(parameters))
 
-        for param in self.parameters:
-            param.resolve_alias(type_map)
+    def resolve_alias(self, type_map):
+        resolved_types = _resolved_types(type_map)
+        return FunctionDeclaration(self.name, resolved_types[self.return_type],
+                                   [param.resolve_alias(resolved_types) for param in self.parameters])
 
     @property
     def has_complex_callback_result(self):
@@ -176,14 +316,31 @@ class FunctionDeclaration:
         return f'Name:{self.name}; Return type: {self.return_type}. Params: {", ".join(str(param) for param in self.parameters)}'
 
 
-class GoVariable:
-    # NOTE - using "variable" as both a function parameter and a struct field, for simplicity
-    def __init__(self, name, type):
-        self.name = name
-        self.type = type
+class EnumDeclaration(namedtuple('EnumDeclaration', ['name', 'values'])):
+    __slots__ = ()
+
+    # Values are (enumerator name, integer value) pairs, in declaration order
+    def __new__(cls, name, values):
+        return super().__new__(cls, name, tuple(values))
 
 
-class GoFunction:
+# NOTE - using "variable" as both a function parameter and a struct field, for simplicity.
+# Length is set only for []byte variables, and names the C length parameter paired with the data pointer
+class GoVariable(namedtuple('GoVariable', ['name', 'type', 'length'])):
+    __slots__ = ()
+
+    def __new__(cls, name, type, length=None):
+        return super().__new__(cls, sys.intern(name), sys.intern(type), length and sys.intern(length))
+
+
+class GoFunction(namedtuple('GoFunction', ['name', 'parameters', 'return_types', 'callback', 'result_struct',
+                                           'indy_function'])):
+    __slots__ = ()
+
+    def __new__(cls, name, parameters, return_types, callback, result_struct, indy_function):
+        return super().__new__(cls, name, tuple(parameters), _intern_tuple(return_types), callback, result_struct,
+                               indy_function)
+
     @classmethod
     def create_from_indy_declaration(cls, function_declaration):
         name = to_camel_case(function_declaration.name)
@@ -191,21 +348,25 @@ class GoFunction:
 
         params = []
         # skipping handle and callback - not visible in public API
-        for c_param in function_declaration.parameters[1:-1]:
+        for c_param, c_length_param in pair_buffers(function_declaration.parameters[1:-1]):
             go_param_name = to_camel_case(c_param.name)
+            go_length_name = None
             if isinstance(c_param, CallbackDeclaration):
                 go_param_name = go_param_name.replace('*', '')
                 go_param_type = c_param.get_go_type_as_string()
+            elif c_length_param:
+                go_param_type = '[]byte'
+                go_length_name = to_camel_case(c_length_param.name)
             else:
                 go_param_type = get_go_type(c_param.type)
             if go_param_name == 'type':
                 go_param_name = 'xtype'
-            go_param = GoVariable(name=go_param_name, type=go_param_type)
+            go_param = GoVariable(name=go_param_name, type=go_param_type, length=go_length_name)
             params.append(go_param)
 
         return_types = []
-        for returned_c_field in function_declaration.callback.parameters[2:]:
-            returned_go_type = get_go_type(returned_c_field.type)
+        for returned_c_field, c_length_field in pair_buffers(function_declaration.callback.parameters[2:]):
+            returned_go_type = '[]byte' if c_length_field else get_go_type(returned_c_field.type)
             return_types.append(returned_go_type)
         return_types.append('error')
 
@@ -220,10 +381,12 @@ class GoFunction:
 
         result_struct_name = name[0].lower() + name[1:] + 'Result'
         result_struct_fields = []
-        for returned_c_field in function_declaration.callback.parameters[1:]:
-            go_type = get_go_type(returned_c_field.type)
+        for returned_c_field, c_length_field in pair_buffers(function_declaration.callback.parameters[1:]):
             go_name = to_camel_case(returned_c_field.name)
-            go_field = GoVariable(name=go_name, type=go_type)
+            if c_length_field:
+                go_field = GoVariable(name=go_name, type='[]byte', length=to_camel_case(c_length_field.name))
+            else:
+                go_field = GoVariable(name=go_name, type=get_go_type(returned_c_field.type))
             result_struct_fields.append(go_field)
 
         result_struct = GoStruct(result_struct_name, result_struct_fields)
@@ -231,22 +394,15 @@ class GoFunction:
         return cls(name, params, return_types, callback, result_struct, function_declaration)
 
 
-    def __init__(self, name, parameters, return_types, callback, result_struct, indy_function):
-        self.name = name
-        self.parameters = parameters
-        self.return_types = return_types
-        self.callback = callback
-        self.result_struct = result_struct
-        self.indy_function = indy_function
+class GoCallback(namedtuple('GoCallback', ['name', 'parameters'])):
+    __slots__ = ()
 
+    def __new__(cls, name, parameters):
+        return super().__new__(cls, name, _intern_tuple(parameters))
 
-class GoCallback:
-    def __init__(self, name, parameters):
-        self.name = name
-        self.parameters = parameters
 
+class GoStruct(namedtuple('GoStruct', ['name', 'fields'])):
+    __slots__ = ()
 
-class GoStruct:
-    def __init__(self, name, fields):
-        self.name = name
-        self.fields = fields
\ No newline at end of file
+    def __new__(cls, name, fields):
+        return super().__new__(cls, name, _intern_tuple(fields))
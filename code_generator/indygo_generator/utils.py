@@ -1,5 +1,28 @@
+import hashlib
+import os
+from functools import lru_cache
+
+
 def to_camel_case(snake_case):
     words = snake_case.split('_')
     new_items = [words[0]]
     new_items.extend([word.title() for word in words[1:]])
-    return ''.join(new_items)
\ No newline at end of file
+    return ''.join(new_items)
+
+
+def is_header_file_name(file_name):
+    return file_name.endswith('.h')
+
+
+@lru_cache(maxsize=None)
+def package_fingerprint():
+    # Any change to the generator sources invalidates whatever a previous version persisted
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for file_name in sorted(os.listdir(package_dir)):
+        if not file_name.endswith('.py'):
+            continue
+        with open(os.path.join(package_dir, file_name), 'rb') as f:
+            digest.update(file_name.encode('utf-8'))
+            digest.update(f.read())
+    return digest.hexdigest()
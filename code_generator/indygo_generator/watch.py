@@ -0,0 +1,35 @@
+import os
+
+from indygo_generator.utils import is_header_file_name
+
+
+class HeaderWatcher:
+    # Keeps the generator (and its parsed declarations) alive and regenerates only headers whose mtime changed
+    def __init__(self, generator):
+        self._generator = generator
+        self._mtimes = {}
+
+    def start(self):
+        self._mtimes = self._scan()
+        self._generator.generate()
+
+    def poll(self):
+        mtimes = self._scan()
+        changed_file_names = [name for name, mtime in mtimes.items() if self._mtimes.get(name) != mtime]
+        removed_file_names = [name for name in self._mtimes if name not in mtimes]
+        if not changed_file_names and not removed_file_names:
+            return [], []
+
+        # Updated before regenerating, so that a header which fails to parse is retried only once it changes again
+        self._mtimes = mtimes
+        self._generator.update_headers(changed_file_names, removed_file_names)
+        return changed_file_names, removed_file_names
+
+    def _scan(self):
+        mtimes = {}
+        with os.scandir(self._generator.header_dir_path) as entries:
+            for entry in entries:
+                if entry.is_file() and is_header_file_name(entry.name):
+                    stat = entry.stat()
+                    mtimes[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return mtimes
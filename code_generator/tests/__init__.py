@@ -148,6 +148,38 @@ indy_error_t indy_issuer_create_and_store_revoc_reg(indy_handle_t command_handle
 TEST_PARAMETERS_STRING = 'indy_handle_t command_handle, indy_handle_t wallet_handle, const char * submitter_did, const char * request_json, void (*cb)(indy_handle_t xcommand_handle, indy_error_t err, const char* signed_request_json)'
 
 
+TEST_NESTED_CALLBACK_PARAMETERS_STRING = 'indy_handle_t command_handle, void (*cb)(indy_handle_t xcommand_handle, indy_error_t (*inner)(indy_handle_t handle, void (*innermost)(const char * value)))'
+
+
+TEST_WALLET_STORAGE_HEADER_FILE = """
+    /// Register custom wallet storage implementation.
+    ///
+    /// #Params
+    /// command_handle: Command handle to map callback to caller context.
+    /// type_: Storage type name.
+    /// create_fn: WalletType create operation handler
+    /// get_value_fn: WalletType get value operation handler
+    /// cb: Callback that takes command result as parameter.
+    extern indy_error_t indy_register_wallet_storage(indy_handle_t  command_handle,
+                                                     const char*  type_,
+
+                                                     /// Create the wallet storage (For example, database creation)
+                                                     indy_error_t (*create_fn)(const char* name,
+                                                                               const char* config,
+                                                                               const char* credentials_json,
+                                                                               const char* metadata),
+
+                                                     /// Get value of the record
+                                                     indy_error_t (*get_value_fn)(indy_handle_t storage_handle,
+                                                                                  indy_handle_t record_handle,
+                                                                                  const indy_u8_t** value_ptr,
+                                                                                  indy_u32_t* value_len),
+
+                                                     void       (*fn)(indy_handle_t command_handle_, indy_error_t err)
+                                                     );
+"""
+
+
 
 TEST_C_FILE_CONTENT = """
 include <stdint.h>
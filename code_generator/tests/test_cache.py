@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from indygo_generator.cache import FragmentCache
+from indygo_generator.types import CallbackDeclaration, FunctionDeclaration, FunctionParameter
+
+
+def _make_declaration(name='sign_request', request_type='const char *'):
+    params = [
+        FunctionParameter(name='command_handle', type='int32_t'),
+        FunctionParameter(name='request_json', type=request_type),
+        CallbackDeclaration(
+            name='cb',
+            return_type='void',
+            parameters=[
+                FunctionParameter(name='xcommand_handle', type='int32_t'),
+                FunctionParameter(name='err', type='int32_t'),
+            ])
+    ]
+    return FunctionDeclaration(name=name, return_type='int32_t', parameters=params)
+
+
+class FragmentCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, 'fragments.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fragments_reused_after_reload(self):
+        generate_fragments = Mock(return_value=('a', 'b', 'c'))
+        cache = FragmentCache(self.cache_path, salt='salt')
+        cache.load()
+
+        fragments = cache.get_fragments(_make_declaration(), generate_fragments)
+        cache.save()
+
+        reloaded_cache = FragmentCache(self.cache_path, salt='salt')
+        reloaded_cache.load()
+        reloaded_fragments = reloaded_cache.get_fragments(_make_declaration(), generate_fragments)
+
+        self.assertEqual(fragments, ('a', 'b', 'c'))
+        self.assertEqual(reloaded_fragments, fragments)
+        self.assertEqual(generate_fragments.call_count, 1)
+        self.assertEqual(reloaded_cache.hits, 1)
+        self.assertEqual(reloaded_cache.misses, 0)
+
+    def test_fingerprint_changes_with_declaration_and_type_map(self):
+        cache = FragmentCache(self.cache_path, salt='salt')
+        fingerprint = cache.fingerprint(_make_declaration())
+
+        self.assertEqual(fingerprint, cache.fingerprint(_make_declaration()))
+        self.assertNotEqual(fingerprint, cache.fingerprint(_make_declaration(name='submit_request')))
+        self.assertNotEqual(fingerprint, cache.fingerprint(_make_declaration(request_type='char *')))
+
+        cache.set_type_map({'indy_handle_t': 'int32_t'})
+        self.assertNotEqual(fingerprint, cache.fingerprint(_make_declaration()))
+
+        type_map_fingerprint = cache.fingerprint(_make_declaration())
+        cache.set_options({'instrument': True})
+        self.assertNotEqual(type_map_fingerprint, cache.fingerprint(_make_declaration()))
+
+    def test_salt_mismatch_discards_entries(self):
+        generate_fragments = Mock(return_value=('a', 'b', 'c'))
+        cache = FragmentCache(self.cache_path, salt='salt')
+        cache.get_fragments(_make_declaration(), generate_fragments)
+        cache.save()
+
+        reloaded_cache = FragmentCache(self.cache_path, salt='other salt')
+        reloaded_cache.load()
+        reloaded_cache.get_fragments(_make_declaration(), generate_fragments)
+
+        self.assertEqual(generate_fragments.call_count, 2)
+        self.assertEqual(reloaded_cache.misses, 1)
+
+    def test_load_reads_cache_once(self):
+        with open(self.cache_path, 'w') as f:
+            f.write('{"version": 1, "salt": "salt", "entries": {}}')
+        cache = FragmentCache(self.cache_path, salt='salt')
+        cache.load()
+        with open(self.cache_path, 'w') as f:
+            f.write('not json')
+
+        cache.load()
+
+    def test_runs_keep_only_entries_of_previous_run(self):
+        generate_fragments = Mock(return_value=('a', 'b', 'c'))
+        cache = FragmentCache(self.cache_path, salt='salt')
+        cache.load()
+        cache.start_run()
+        cache.get_fragments(_make_declaration(), generate_fragments)
+        cache.get_fragments(_make_declaration(name='submit_request'), generate_fragments)
+
+        cache.start_run()
+        cache.get_fragments(_make_declaration(), generate_fragments)
+        cache.discard([_make_declaration()])
+        cache.get_fragments(_make_declaration(name='open_wallet'), generate_fragments)
+        cache.save()
+
+        reloaded_cache = FragmentCache(self.cache_path, salt='salt')
+        reloaded_cache.load()
+        self.assertEqual(set(reloaded_cache._entries),
+                         {reloaded_cache.fingerprint(_make_declaration(name='open_wallet'))})
+        self.assertEqual(generate_fragments.call_count, 3)
+
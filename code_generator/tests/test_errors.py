@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from indygo_generator.errors import find_error_enum, generate_errors_code
+from indygo_generator.generator import Generator
+from indygo_generator.types import EnumDeclaration
+from . import TEST_HEADER_FILE
+
+
+class ErrorsTests(unittest.TestCase):
+    def test_generate_preallocated_errors(self):
+        error_enum = EnumDeclaration('indy_error_t', [('Success', 0), ('CommonInvalidParam1', 100),
+                                                      ('CommonAlias', 100), ('WalletItemNotFound', 212)])
+
+        code = generate_errors_code(error_enum)
+
+        self.assertIn('ErrWalletItemNotFound = &IndyError{Code: 212, Name: "WalletItemNotFound", '
+                      'message: "Libindy returned code: 212 (WalletItemNotFound)"}', code)
+        self.assertIn('\tcase 100:\n\t\treturn ErrCommonInvalidParam1\n\tcase 212:\n\t\treturn ErrWalletItemNotFound\n',
+                      code)
+        self.assertNotIn('ErrSuccess', code)
+        self.assertNotIn('ErrCommonAlias', code)
+
+    def test_generate_errors_without_enum(self):
+        code = generate_errors_code()
+
+        self.assertIn('func indyError(code int32) error {\n\tswitch code {\n\t}\n', code)
+        self.assertNotIn('var (', code)
+
+    def test_find_error_enum(self):
+        error_enum = EnumDeclaration('indy_error_t', [('Success', 0)])
+        header_enums = {'indy_mod.h': [EnumDeclaration('indy_flags_t', []), error_enum]}
+
+        self.assertIs(find_error_enum(header_enums), error_enum)
+        self.assertIsNone(find_error_enum({}))
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_writes_errors_from_scraped_enum(self, read_header_files_patch):
+        read_header_files_patch.return_value = {
+            'indy_ledger.h': TEST_HEADER_FILE,
+            'indy_mod.h': 'typedef enum\n{\n    Success = 0,\n    PoolLedgerTimeout = 307,\n} indy_error_t;\n',
+        }
+
+        with tempfile.TemporaryDirectory() as output_path:
+            Generator(Mock(), output_path).generate()
+            with open(os.path.join(output_path, 'indy_errors.go'), 'r') as f:
+                code = f.read()
+
+        self.assertIn('\tcase 307:\n\t\treturn ErrPoolLedgerTimeout\n', code)
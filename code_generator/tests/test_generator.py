@@ -1,8 +1,12 @@
 import unittest
+import os
 import re
+import tempfile
 from unittest.mock import patch, Mock
 
-from indygo_generator.generator import Generator
+from indygo_generator import types
+from indygo_generator.generator import Generator, GeneratorError, _shard_declarations
+from indygo_generator.profiling import GenerationProfile
 from indygo_generator.types import CallbackDeclaration, FunctionDeclaration, FunctionParameter, GoFunction, GoVariable
 
 from . import TEST_HEADER_FILE, TEST_C_FILE_CONTENT
@@ -18,7 +22,7 @@ class GeneratorTests(unittest.TestCase):
             FunctionParameter(name='wallet_handle', type='int32_t'),
             FunctionParameter(name='submitter_did', type='const char *'),
             FunctionParameter(name='request_json', type='const char *'),
-            CallbackDeclaration(
+            CallbackDeclaration(name='cb',
                 return_type='void',
                 parameters=[
                     FunctionParameter(name='xcommand_handle', type='int32_t'),
@@ -153,16 +157,15 @@ class GeneratorTests(unittest.TestCase):
         expected_callback_code = r"""
         //export signRequestCallback
         func signRequestCallback(xcommandHandle int32, err int32, signedRequestJson *C.char) {
-            resCh, err := resolver.DeregisterCall(xcommandHandle)
-            if err != nil {
+            completion, registryErr := resolver.DeregisterCall(xcommandHandle)
+            if registryErr != nil {
 		        panic("Invalid handle in callback")
 	        }
 	        
-	        res := &signRequestResult{
+	        completion.(chan signRequestResult) <- signRequestResult{
 		        err: err,
 		        signedRequestJson: C.GoString(signedRequestJson),
 	        }
-	        resCh <- res
         }
         """
         expected_callback_code = re.sub(_WHITESPACE_PATT, '', expected_callback_code)
@@ -193,10 +196,7 @@ class GeneratorTests(unittest.TestCase):
 
         expected_variable_setup_code = """
         var c_requestJson *C.char
-        if requestJson != "" {
-            c_requestJson = C.CString(requestJson)
-            defer C.free(unsafe.Pointer(c_requestJson))
-        }
+        c_requestJson = arena.cString(requestJson)
         """
         expected_variable_setup_code = re.sub(_WHITESPACE_PATT, '', expected_variable_setup_code)
 
@@ -206,52 +206,115 @@ class GeneratorTests(unittest.TestCase):
         self.assertEqual(cgo_var_name, 'c_requestJson')
         self.assertEqual(expected_variable_setup_code, actual_variable_setup_code)
 
+    def test_generate_correct_buffer_setup_code(self):
+        variable = GoVariable(name='messageRaw', type='[]byte', length='messageLen')
+
+        expected_buffer_setup_code = """
+        var c_messageRaw *C.uint8_t
+        if len(messageRaw) > 0 {
+            c_messageRaw = (*C.uint8_t)(unsafe.Pointer(&messageRaw[0]))
+        }
+        c_messageLen := C.uint32_t(len(messageRaw))
+        """
+        expected_buffer_setup_code = re.sub(_WHITESPACE_PATT, '', expected_buffer_setup_code)
+
+        cgo_var_names, actual_buffer_setup_code = Generator._generate_buffer_setup_code(variable)
+        actual_buffer_setup_code = re.sub(_WHITESPACE_PATT, '', actual_buffer_setup_code)
+
+        self.assertEqual(cgo_var_names, ['c_messageRaw', 'c_messageLen'])
+        self.assertEqual(expected_buffer_setup_code, actual_buffer_setup_code)
+
     def test_generate_correct_api_function_code(self):
         expected_api_function_code = """
         func SignRequest(walletHandle int32, submitterDid string, requestJson string) (string, error) {
-            pointer, commandHandle, resCh, err := resolver.RegisterCall("indy_sign_request")
+            return SignRequestAsync(walletHandle, submitterDid, requestJson).Wait()
+        }
+        """
+        expected_api_function_code = re.sub(_WHITESPACE_PATT, '', expected_api_function_code)
+
+        actual_api_function_code = Generator._generate_api_function_code(self.go_function)
+        actual_api_function_code = re.sub(_WHITESPACE_PATT, '', actual_api_function_code)
+
+        self.assertEqual(expected_api_function_code, actual_api_function_code)
+
+    def test_generate_correct_async_api_function_code(self):
+        expected_api_function_code = """
+        func SignRequestAsync(walletHandle int32, submitterDid string, requestJson string) *SignRequestFuture {
+            pointer, err := signRequestSymbol.Pointer()
             if err != nil {
-                return "", err
+                return &SignRequestFuture{err: err}
+            }
+
+            completion := signRequestCompletions.Get().(chan signRequestResult)
+            commandHandle, err := resolver.RegisterCall(completion)
+            if err != nil {
+                signRequestCompletions.Put(completion)
+                return &SignRequestFuture{err: err}
             }
 
+            arena := acquireArena(len(submitterDid) + len(requestJson) + 2)
+
             var c_walletHandle C.int32_t
             c_walletHandle = C.int32_t(walletHandle)
 
             var c_submitterDid *C.char
-            if submitterDid != "" {
-                c_submitterDid = C.CString(submitterDid)
-                defer C.free(unsafe.Pointer(c_submitterDid))
-            }
+            c_submitterDid = arena.cString(submitterDid)
 
             var c_requestJson *C.char
-            if requestJson != "" {
-                c_requestJson = C.CString(requestJson)
-                defer C.free(unsafe.Pointer(c_requestJson))
-            }
+            c_requestJson = arena.cString(requestJson)
             
-            resCode := C.indy_sign_request_proxy(commandHandle, c_walletHandle, c_submitterDid, c_requestJson)
+            resCode := C.indy_sign_request_proxy(pointer, C.int32_t(commandHandle), c_walletHandle, c_submitterDid, c_requestJson)
+            releaseArena(arena)
             if resCode != 0 {
-                err = fmt.Errorf("Libindy returned code: %d", resCode)
-                return "", err
+                resolver.DeregisterCall(commandHandle)
+                signRequestCompletions.Put(completion)
+                return &SignRequestFuture{err: indyError(int32(resCode))}
             }
             
-            _res := <- resCh
-            res := _res.(*signRequestResult)
-            
+            return &SignRequestFuture{completion: completion}
+        }
+        """
+        expected_api_function_code = re.sub(_WHITESPACE_PATT, '', expected_api_function_code)
+
+        actual_api_function_code = Generator._generate_async_api_function_code(self.go_function)
+        actual_api_function_code = re.sub(_WHITESPACE_PATT, '', actual_api_function_code)
+
+        self.assertEqual(expected_api_function_code, actual_api_function_code)
+
+    def test_generate_correct_future_code(self):
+        expected_future_code = """
+        // SignRequestFuture is the result of a SignRequestAsync call. It can be waited on once
+        type SignRequestFuture struct {
+            completion chan signRequestResult
+            err error
+        }
+
+        func (f *SignRequestFuture) Wait() (string, error) {
+            if f.err != nil {
+                return "", f.err
+            }
+            if f.completion == nil {
+                return "", ErrFutureWaited
+            }
+
+            res := <-f.completion
+            signRequestCompletions.Put(f.completion)
+            f.completion = nil
+
             if res.err != 0 {
-                err = fmt.Errorf("Libindy returned code: %d", res.err)
+                err := indyError(int32(res.err))
                 return "", err
             }
-            
+
             return res.signedRequestJson, nil
         }
         """
-        expected_api_function_code = re.sub(_WHITESPACE_PATT, '', expected_api_function_code)
+        expected_future_code = re.sub(_WHITESPACE_PATT, '', expected_future_code)
 
-        actual_api_function_code = Generator._generate_api_function_code(self.go_function)
-        actual_api_function_code = re.sub(_WHITESPACE_PATT, '', actual_api_function_code)
+        actual_future_code = Generator._generate_future_code(self.go_function)
+        actual_future_code = re.sub(_WHITESPACE_PATT, '', actual_future_code)
 
-        self.assertEqual(expected_api_function_code, actual_api_function_code)
+        self.assertEqual(expected_future_code, actual_future_code)
 
     def test_generate_code(self):
         indy_file_name = 'ledger.h'
@@ -268,6 +331,327 @@ class GeneratorTests(unittest.TestCase):
         self.assertEqual(c_code, expected_c_code)
         self.assertEqual(go_code, expected_go_code)
 
+    def test_emit_code_streams_fragments_to_sinks(self):
+        c_sink = Mock()
+        go_sink = Mock()
+        declarations = [self.indy_function, self.indy_function]
+
+        Generator._emit_code('ledger.h', declarations, c_sink, go_sink)
+
+        c_code, go_code = Generator._generate_code('ledger.h', declarations)
+        self.assertEqual(''.join(call.args[0] for call in c_sink.write.call_args_list), c_code)
+        self.assertEqual(''.join(call.args[0] for call in go_sink.write.call_args_list), go_code)
+        self.assertEqual(c_sink.write.call_count, 3)
+        self.assertEqual(go_sink.write.call_count, 8)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_reuses_cached_fragments(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            cache_path = os.path.join(output_path, 'fragments.json')
+            Generator(Mock(), output_path, cache_path=cache_path).generate()
+            with open(os.path.join(output_path, 'ledger.go')) as f:
+                first_go_code = f.read()
+
+            with patch.object(Generator, '_generate_declaration_fragments') as generate_fragments_patch:
+                Generator(Mock(), output_path, cache_path=cache_path).generate()
+            with open(os.path.join(output_path, 'ledger.go')) as f:
+                second_go_code = f.read()
+
+        generate_fragments_patch.assert_not_called()
+        self.assertEqual(first_go_code, second_go_code)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_reports_profile(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            cprofile_path = os.path.join(output_path, 'generate.prof')
+            profile = GenerationProfile(slowest_declarations_count=2, cprofile_path=cprofile_path)
+            Generator(Mock(), output_path, profile=profile).generate()
+            cprofile_written = os.path.exists(cprofile_path)
+
+        report = profile.report()
+        self.assertTrue(cprofile_written)
+        self.assertEqual(set(report['phases'].keys()),
+                         {'scraping', 'typedef_merge', 'alias_resolution', 'go_model_construction', 'emission',
+                          'file_writes'})
+        self.assertEqual(report['phases']['go_model_construction']['calls'], 3)
+        self.assertGreater(report['phases']['file_writes']['bytes'], 0)
+        self.assertEqual(len(report['slowest_declarations']), 2)
+        self.assertGreater(report['total_seconds'], 0)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_with_workers_matches_serial_output(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_pool.h': TEST_HEADER_FILE, 'indy_ledger.h': TEST_HEADER_FILE}
+
+        outputs = []
+        for workers in (1, 2):
+            with tempfile.TemporaryDirectory() as output_path:
+                cache_path = os.path.join(output_path, 'fragments.json')
+                Generator(Mock(), output_path, cache_path=cache_path, workers=workers).generate()
+                output = {}
+                for file_name in sorted(os.listdir(output_path)):
+                    with open(os.path.join(output_path, file_name)) as f:
+                        output[file_name] = f.read()
+                outputs.append(output)
+
+        self.assertEqual(sorted(outputs[1].keys()),
+                         ['fragments.json', 'indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                          'ledger.go', 'pool.c', 'pool.go'])
+        self.assertEqual(outputs[0], outputs[1])
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_rewrites_only_changed_files(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            written_file_names = Generator(Mock(), output_path).generate()
+            go_file_path = os.path.join(output_path, 'ledger.go')
+            os.utime(go_file_path, ns=(0, 0))
+
+            rewritten_file_names = Generator(Mock(), output_path).generate()
+            go_file_mtime = os.stat(go_file_path).st_mtime_ns
+            file_names = sorted(os.listdir(output_path))
+
+        self.assertEqual(written_file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                                              'ledger.go'])
+        self.assertEqual(rewritten_file_names, [])
+        self.assertEqual(go_file_mtime, 0)
+        self.assertEqual(file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                                      'ledger.go'])
+
+    @patch.object(Generator, '_read_header_files')
+    def test_prepare_resolves_typedef_chains_across_headers(self, read_header_files_patch):
+        read_header_files_patch.return_value = {
+            'indy_ledger.h': TEST_HEADER_FILE.replace('indy_handle_t wallet_handle', 'indy_wallet_t wallet_handle'),
+            'indy_types.h': 'typedef int32_t indy_i32_t;\n',
+            'indy_wallet.h': 'typedef indy_i32_t indy_wallet_t;\n',
+        }
+        generator = Generator(Mock(), Mock())
+
+        generator._prepare_c_function_declarations()
+
+        parameter_types = {param.name: param.type for declaration in generator._c_function_declarations['indy_ledger.h']
+                           for param in declaration.parameters}
+        self.assertEqual(parameter_types['wallet_handle'], 'int32_t')
+        self.assertEqual(generator.resolved_types['indy_wallet_t'], 'int32_t')
+
+    def test_streaming_generate_matches_full_generate(self):
+        with tempfile.TemporaryDirectory() as header_dir_path, tempfile.TemporaryDirectory() as output_path, \
+                tempfile.TemporaryDirectory() as streaming_output_path:
+            for file_name, content in [('indy_ledger.h', TEST_HEADER_FILE),
+                                       ('indy_types.h', 'typedef int32_t indy_handle_t;\n'),
+                                       ('README.md', 'extern broken(')]:
+                with open(os.path.join(header_dir_path, file_name), 'w') as f:
+                    f.write(content)
+
+            Generator(header_dir_path, output_path).generate()
+            generator = Generator(header_dir_path, streaming_output_path, streaming=True)
+            with patch.object(Generator, '_read_header_files') as read_header_files_patch:
+                written_file_names = generator.generate()
+            outputs = []
+            for path in (output_path, streaming_output_path):
+                outputs.append({})
+                for file_name in os.listdir(path):
+                    with open(os.path.join(path, file_name), 'r') as f:
+                        outputs[-1][file_name] = f.read()
+
+        read_header_files_patch.assert_not_called()
+        self.assertEqual(generator._c_function_declarations, {})
+        self.assertEqual(written_file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                                              'ledger.go', 'types.c', 'types.go'])
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_streaming_rejects_stubs_and_workers(self):
+        with self.assertRaises(GeneratorError):
+            Generator(Mock(), Mock(), streaming=True, stubs=True)
+        with self.assertRaises(GeneratorError):
+            Generator(Mock(), Mock(), streaming=True, workers=2)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_shards_header_output(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            Generator(Mock(), output_path).generate()
+            written_file_names = Generator(Mock(), output_path, shards=2).generate()
+            file_names = sorted(os.listdir(output_path))
+            with open(os.path.join(output_path, 'ledger.shard1.go'), 'r') as f:
+                go_code = f.read()
+            unsharded_file_names = Generator(Mock(), output_path).generate()
+
+        self.assertEqual(written_file_names, ['ledger.c', 'ledger.go', 'ledger.shard0.c', 'ledger.shard0.go',
+                                              'ledger.shard1.c', 'ledger.shard1.go'])
+        self.assertEqual(file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.shard0.c',
+                                      'ledger.shard0.go', 'ledger.shard1.c', 'ledger.shard1.go'])
+        self.assertIn('var ledgerSymbolsShard1 = newSymbolTable(', go_code)
+        self.assertIn('ledgerSymbolsShard1.symbol(0)', go_code)
+        self.assertEqual(unsharded_file_names, written_file_names)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_shards_do_not_collide_with_numbered_headers(self, read_header_files_patch):
+        read_header_files_patch.return_value = {
+            'indy_ledger.h': TEST_HEADER_FILE,
+            'indy_ledger_2.h': TEST_HEADER_FILE.replace('indy_sign', 'indy_ledger_2_sign'),
+        }
+
+        for workers in (1, 2):
+            with tempfile.TemporaryDirectory() as output_path:
+                Generator(Mock(), output_path, workers=workers, shards=2).generate()
+                written_file_names = Generator(Mock(), output_path, workers=workers).generate()
+                stale_file_names = Generator(Mock(), output_path, workers=workers).check()
+                file_names = sorted(os.listdir(output_path))
+                with open(os.path.join(output_path, 'ledger_2.go'), 'r') as f:
+                    go_code = f.read()
+
+            self.assertEqual(written_file_names, ['ledger.c', 'ledger.go', 'ledger.shard0.c', 'ledger.shard0.go',
+                                                  'ledger.shard1.c', 'ledger.shard1.go', 'ledger_2.c', 'ledger_2.go',
+                                                  'ledger_2.shard0.c', 'ledger_2.shard0.go', 'ledger_2.shard1.c',
+                                                  'ledger_2.shard1.go'])
+            self.assertEqual(stale_file_names, [])
+            self.assertEqual(file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                                          'ledger.go', 'ledger_2.c', 'ledger_2.go'])
+            self.assertIn('var ledger2Symbols = newSymbolTable(', go_code)
+
+    def test_shard_declarations_keeps_order_and_balances_weight(self):
+        declarations = [FunctionDeclaration(name=f'function_{i}', return_type='int32_t',
+                                            parameters=[self.indy_function.parameters[0]] * parameter_count)
+                        for i, parameter_count in enumerate([5, 1, 1, 1, 1, 5])]
+
+        sharded_declarations = _shard_declarations(declarations, 2)
+
+        self.assertEqual([[declaration.name for declaration in shard] for shard in sharded_declarations],
+                         [['function_0', 'function_1', 'function_2'], ['function_3', 'function_4', 'function_5']])
+        self.assertEqual(_shard_declarations(declarations[:1], 4), [declarations[:1]])
+        self.assertEqual(_shard_declarations(declarations, 1), [declarations])
+
+    @patch.object(Generator, '_read_header_files')
+    def test_check_reports_stale_files_without_writing(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            missing_file_names = Generator(Mock(), output_path).check()
+            Generator(Mock(), output_path).generate()
+            go_file_path = os.path.join(output_path, 'ledger.go')
+            with open(go_file_path, 'a') as f:
+                f.write('\n// edited')
+
+            stale_file_names = Generator(Mock(), output_path).check()
+            with open(go_file_path) as f:
+                go_code = f.read()
+
+        self.assertEqual(missing_file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                                              'ledger.go'])
+        self.assertEqual(stale_file_names, ['ledger.go'])
+        self.assertTrue(go_code.endswith('// edited'))
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_output_does_not_depend_on_listing_order(self, read_header_files_patch):
+        header_file_contents = {'indy_pool.h': TEST_HEADER_FILE, 'indy_ledger.h': TEST_HEADER_FILE,
+                                'indy_types.h': '    typedef int32_t indy_handle_t;'}
+
+        outputs = []
+        for file_names in (sorted(header_file_contents), sorted(header_file_contents, reverse=True)):
+            read_header_files_patch.return_value = {file_name: header_file_contents[file_name]
+                                                    for file_name in file_names}
+            with tempfile.TemporaryDirectory() as output_path:
+                Generator(Mock(), output_path).generate()
+                output = {}
+                for file_name in sorted(os.listdir(output_path)):
+                    with open(os.path.join(output_path, file_name)) as f:
+                        output[file_name] = f.read()
+                outputs.append(output)
+
+        self.assertEqual(outputs[0], outputs[1])
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_clears_interned_tuples_of_earlier_runs(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+        stale_parameters = CallbackDeclaration('cb', 'void', [FunctionParameter('stale', 'int32_t')]).parameters
+
+        with tempfile.TemporaryDirectory() as output_path:
+            Generator(Mock(), output_path).generate()
+
+        self.assertNotIn(stale_parameters, types._interned_tuples)
+        self.assertTrue(types._interned_tuples)
+
+    def test_generate_instrumented_code(self):
+        _, go_code = Generator._generate_code('ledger.h', [self.indy_function], instrument=True)
+        _, uninstrumented_go_code = Generator._generate_code('ledger.h', [self.indy_function])
+
+        self.assertIn('var signRequestMetrics = newCallMetrics("indy_sign_request")', go_code)
+        self.assertIn('signRequestMetrics.submitted(started, int32(resCode))', go_code)
+        self.assertIn('signRequestMetrics.completed(err)', go_code)
+        self.assertIn('signRequestMetrics.collected(f.started, res.completed, res.err)', go_code)
+        self.assertNotIn('Metrics', uninstrumented_go_code)
+        self.assertNotIn('monotonicNow', uninstrumented_go_code)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_writes_instrumentation_runtime_only_when_instrumented(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            Generator(Mock(), output_path, instrument=True).generate()
+            instrumented_file_names = sorted(os.listdir(output_path))
+            Generator(Mock(), output_path).generate()
+            file_names = sorted(os.listdir(output_path))
+
+        self.assertEqual(instrumented_file_names,
+                         ['indy_errors.go', 'indy_instrumentation.go', 'indy_registry_test.go', 'indy_runtime.go',
+                          'ledger.c', 'ledger.go'])
+        self.assertEqual(file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                                      'ledger.go'])
+
+
+    def test_generate_ring_delivery_code(self):
+        c_code, go_code = Generator._generate_code('ledger.h', [self.indy_function], ring=True)
+
+        self.assertIn('#include "indy_ring.h"', c_code)
+        self.assertIn('static void indy_sign_request_ring_callback(int32_t xcommand_handle, int32_t err, '
+                      'const char * signed_request_json) {', c_code)
+        self.assertIn('entry.values[0].data = indy_ring_copy_string(signed_request_json);', c_code)
+        self.assertIn('&indy_sign_request_ring_callback);', c_code)
+        self.assertNotIn('extern void signRequestCallback', c_code)
+        self.assertIn('if err := startRingDelivery(); err != nil {', go_code)
+        self.assertIn('resolver.RegisterCall(signRequestRingCompletion(completion))', go_code)
+        self.assertIn('func (c signRequestRingCompletion) deliver(entry *ringEntry) {', go_code)
+        self.assertIn('signedRequestJson: entry.stringValue(0),', go_code)
+        self.assertNotIn('//export signRequestCallback', go_code)
+
+    def test_ring_delivery_falls_back_to_exported_callback(self):
+        # Ring entries hold up to 8 values
+        callback = CallbackDeclaration(name='cb', return_type='void', parameters=[
+            FunctionParameter(name='xcommand_handle', type='int32_t'),
+            FunctionParameter(name='err', type='int32_t'),
+        ] + [FunctionParameter(name=f'value_{i}', type='int32_t') for i in range(9)])
+        indy_function = FunctionDeclaration(name='open_thing', return_type='int32_t',
+                                            parameters=[FunctionParameter(name='command_handle', type='int32_t'),
+                                                        callback])
+
+        c_code, go_code = Generator._generate_code('thing.h', [indy_function], ring=True)
+
+        self.assertIn('extern void openThingCallback', c_code)
+        self.assertIn('&openThingCallback);', c_code)
+        self.assertNotIn('ring_callback', c_code)
+        self.assertIn('//export openThingCallback', go_code)
+        self.assertNotIn('startRingDelivery', go_code)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_writes_ring_runtime_only_with_ring_delivery(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            Generator(Mock(), output_path, ring_delivery=True).generate()
+            ring_file_names = sorted(os.listdir(output_path))
+            Generator(Mock(), output_path).generate()
+            file_names = sorted(os.listdir(output_path))
+
+        self.assertEqual(ring_file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_ring.c', 'indy_ring.go',
+                                           'indy_ring.h', 'indy_runtime.go', 'ledger.c', 'ledger.go'])
+        self.assertEqual(file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go', 'ledger.c',
+                                      'ledger.go'])
 
 
 EXPECTED_C_CODE = """
@@ -297,42 +681,88 @@ import "C"
 
 import (
     "fmt"
+    "sync"
     "unsafe"
 )
 
+// Keeps imports used in files whose functions do not need all of them
+var (
+    _ = fmt.Errorf
+    _ sync.Pool
+    _ unsafe.Pointer
+)
+
+var ledgerSymbols = newSymbolTable(
+    "indy_sign_request",
+)
+
+var (
+    signRequestSymbol = ledgerSymbols.symbol(0)
+)
+
 
 func SignRequest(walletHandle int32, submitterDid string, requestJson string) (string, error) {
-	pointer, commandHandle, resCh, err := resolver.RegisterCall("indy_sign_request")
+	return SignRequestAsync(walletHandle, submitterDid, requestJson).Wait()
+}
+
+
+func SignRequestAsync(walletHandle int32, submitterDid string, requestJson string) *SignRequestFuture {
+	pointer, err := signRequestSymbol.Pointer()
 	if err != nil {
-	    return "", err
+	    return &SignRequestFuture{err: err}
 	}
 	
+	completion := signRequestCompletions.Get().(chan signRequestResult)
+	commandHandle, err := resolver.RegisterCall(completion)
+	if err != nil {
+	    signRequestCompletions.Put(completion)
+	    return &SignRequestFuture{err: err}
+	}
+	
+	arena := acquireArena(len(submitterDid) + len(requestJson) + 2)
+	
 	var c_walletHandle C.int32_t
 	c_walletHandle = C.int32_t(walletHandle)
 	
 	var c_submitterDid *C.char
-	if submitterDid != "" {
-	    c_submitterDid = C.CString(submitterDid)
-	    defer C.free(unsafe.Pointer(c_submitterDid))
-	}
+	c_submitterDid = arena.cString(submitterDid)
 	
 	var c_requestJson *C.char
-	if requestJson != "" {
-	    c_requestJson = C.CString(requestJson)
-	    defer C.free(unsafe.Pointer(c_requestJson))
-	}
+	c_requestJson = arena.cString(requestJson)
 	
-	resCode := C.indy_sign_request_proxy(commandHandle, c_walletHandle, c_submitterDid, c_requestJson)
+	resCode := C.indy_sign_request_proxy(pointer, C.int32_t(commandHandle), c_walletHandle, c_submitterDid, c_requestJson)
+	releaseArena(arena)
 	if resCode != 0 {
-	    err = fmt.Errorf("Libindy returned code: %d", resCode)
-	    return "", err
+	    resolver.DeregisterCall(commandHandle)
+	    signRequestCompletions.Put(completion)
+	    return &SignRequestFuture{err: indyError(int32(resCode))}
 	}
 	
-	_res := <- resCh
-	res := _res.(*signRequestResult)
+	return &SignRequestFuture{completion: completion}
+}
+
+
+// SignRequestFuture is the result of a SignRequestAsync call. It can be waited on once
+type SignRequestFuture struct {
+    completion chan signRequestResult
+    err error
+}
+
+
+func (f *SignRequestFuture) Wait() (string, error) {
+	if f.err != nil {
+	    return "", f.err
+	}
+	if f.completion == nil {
+	    return "", ErrFutureWaited
+	}
+	
+	res := <-f.completion
+	signRequestCompletions.Put(f.completion)
+	f.completion = nil
 	
 	if res.err != 0 {
-	    err = fmt.Errorf("Libindy returned code: %d", res.err)
+	    err := indyError(int32(res.err))
 	    return "", err
 	}
 	
@@ -346,17 +776,23 @@ type signRequestResult struct {
 }
 
 
+var signRequestCompletions = sync.Pool{
+    New: func() interface{} {
+        return make(chan signRequestResult, 1)
+    },
+}
+
+
 //export signRequestCallback
 func signRequestCallback(xcommandHandle int32, err int32, signedRequestJson *C.char) {
-    resCh, err := resolver.DeregisterCall(xcommandHandle)
-    if err != nil {
+    completion, registryErr := resolver.DeregisterCall(xcommandHandle)
+    if registryErr != nil {
         panic("Invalid handle in callback")
     }
     
-    res := &signRequestResult{
+    completion.(chan signRequestResult) <- signRequestResult{
         err: err,
         signedRequestJson: C.GoString(signedRequestJson),
     }
-    resCh <- res
 }
 """
\ No newline at end of file
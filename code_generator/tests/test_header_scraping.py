@@ -1,14 +1,15 @@
 import unittest
 
 from indygo_generator import header_scraping
-from indygo_generator.types import FunctionParameter, CallbackDeclaration
+from indygo_generator.types import CallbackDeclaration, EnumDeclaration, FunctionParameter
 
-from . import TEST_HEADER_FILE, TEST_FUNCTION_DECLARATION, TEST_PARAMETERS_STRING
+from . import (TEST_HEADER_FILE, TEST_FUNCTION_DECLARATION, TEST_PARAMETERS_STRING, TEST_NESTED_CALLBACK_PARAMETERS_STRING,
+               TEST_WALLET_STORAGE_HEADER_FILE)
 
 
 class HeaderScrapingTests(unittest.TestCase):
     def test_scrape_header_file(self):
-        declarations, type_map = header_scraping.scrape_header_file(TEST_HEADER_FILE)
+        declarations, type_map, _ = header_scraping.scrape_header_file(TEST_HEADER_FILE)
 
         self.assertEqual(len(declarations), 3)
         declaration_1 = declarations[0]
@@ -70,12 +71,111 @@ class HeaderScrapingTests(unittest.TestCase):
         self.assertEqual(callback.parameters[2].name, 'signed_request_json')
         self.assertEqual(callback.parameters[2].type, 'const char*')
 
-    def test_split_params(self):
-        param_strings = header_scraping._split_parameter_string(TEST_PARAMETERS_STRING)
+    def test_parse_callback_parameters_at_arbitrary_depth(self):
+        parameters = header_scraping._parse_function_parameters(TEST_NESTED_CALLBACK_PARAMETERS_STRING)
 
-        self.assertEqual(len(param_strings), 5)
-        self.assertEqual(param_strings[0], 'indy_handle_t command_handle')
-        self.assertEqual(param_strings[1], 'indy_handle_t wallet_handle')
-        self.assertEqual(param_strings[2], 'const char * submitter_did')
-        self.assertEqual(param_strings[3], 'const char * request_json')
-        self.assertEqual(param_strings[4], 'void (*cb)(indy_handle_t xcommand_handle, indy_error_t err, const char* signed_request_json)')
+        self.assertEqual(len(parameters), 2)
+        outer_callback = parameters[1]
+        self.assertTrue(isinstance(outer_callback, CallbackDeclaration))
+        self.assertEqual(outer_callback.name, 'cb')
+        self.assertEqual(len(outer_callback.parameters), 2)
+        inner_callback = outer_callback.parameters[1]
+        self.assertTrue(isinstance(inner_callback, CallbackDeclaration))
+        self.assertEqual(inner_callback.name, 'inner')
+        self.assertEqual(inner_callback.return_type, 'indy_error_t')
+        self.assertEqual(len(inner_callback.parameters), 2)
+        innermost_callback = inner_callback.parameters[1]
+        self.assertTrue(isinstance(innermost_callback, CallbackDeclaration))
+        self.assertEqual(innermost_callback.name, 'innermost')
+        self.assertEqual(innermost_callback.parameters[0].name, 'value')
+        self.assertEqual(innermost_callback.parameters[0].type, 'const char *')
+
+    def test_scrape_wallet_storage_registration(self):
+        declarations, type_map, _ = header_scraping.scrape_header_file(TEST_WALLET_STORAGE_HEADER_FILE)
+
+        self.assertEqual(type_map, {})
+        self.assertEqual(len(declarations), 1)
+        declaration = declarations[0]
+        self.assertEqual(declaration.name, 'register_wallet_storage')
+        self.assertEqual(len(declaration.parameters), 5)
+        self.assertEqual(declaration.parameters[1].type, 'const char*')
+        create_callback = declaration.parameters[2]
+        self.assertTrue(isinstance(create_callback, CallbackDeclaration))
+        self.assertEqual(create_callback.name, 'create_fn')
+        self.assertEqual(create_callback.return_type, 'indy_error_t')
+        self.assertEqual([param.name for param in create_callback.parameters],
+                         ['name', 'config', 'credentials_json', 'metadata'])
+        get_value_callback = declaration.parameters[3]
+        self.assertEqual(get_value_callback.parameters[2].type, 'const indy_u8_t**')
+        callback = declaration.parameters[4]
+        self.assertEqual(callback.name, 'fn')
+        self.assertEqual(callback.return_type, 'void')
+        self.assertEqual(len(callback.parameters), 2)
+
+    def test_scrape_ignores_declarations_in_comments(self):
+        header_file_content = '/* extern indy_error_t indy_fake(int32_t a); */\n' \
+                              '// typedef int fake_t;\n' + TEST_FUNCTION_DECLARATION.replace('indy_error_t', 'extern indy_error_t', 1)
+
+        declarations, type_map, _ = header_scraping.scrape_header_file(header_file_content)
+
+        self.assertEqual(type_map, {})
+        self.assertEqual([declaration.name for declaration in declarations], ['sign_request'])
+
+    def test_scrape_invalid_declaration_raises(self):
+        with self.assertRaises(header_scraping.ParsingError):
+            header_scraping.scrape_header_file('extern indy_error_t indy_broken(indy_handle_t command_handle,);')
+
+    def test_scrape_unterminated_comment_raises(self):
+        truncated_header_file = TEST_HEADER_FILE + '\n/* extern indy_error_t indy_truncated(indy_handle_t command_handle);'
+
+        with self.assertRaises(header_scraping.ParsingError):
+            header_scraping.scrape_header_file(truncated_header_file)
+        # Used to take quadratic time, rescanning to the end of the header at every comment start
+        with self.assertRaises(header_scraping.ParsingError):
+            header_scraping.scrape_header_file(' /* comment\n' * 16000)
+
+    def test_scrape_header_file_enums(self):
+        header_file_content = ('typedef enum\n{\n    Success = 0,\n\n    // Common errors\n    CommonInvalidParam1 = 100,\n'
+                               '    CommonInvalidParam2,\n    CommonAlias = CommonInvalidParam1,\n    WalletError = 0xC8,\n'
+                               '} indy_error_t;\n' + TEST_HEADER_FILE)
+
+        declarations, _, enums = header_scraping.scrape_header_file(header_file_content)
+
+        self.assertEqual(enums, [EnumDeclaration('indy_error_t', [('Success', 0), ('CommonInvalidParam1', 100),
+                                                                  ('CommonInvalidParam2', 101), ('CommonAlias', 100),
+                                                                  ('WalletError', 200)])])
+        self.assertEqual(len(declarations), 3)
+
+    def test_scrape_unsupported_error_enum_value_raises(self):
+        with self.assertRaises(header_scraping.ParsingError):
+            header_scraping.scrape_header_file('typedef enum { A = 1 << 2 } indy_error_t;')
+
+    def test_scrape_skips_other_unsupported_enums(self):
+        header_file_content = 'typedef enum { A = 1 << 2, B = (A | 1) } flags_t;\n' + TEST_HEADER_FILE
+
+        declarations, _, enums = header_scraping.scrape_header_file(header_file_content)
+
+        self.assertEqual(enums, [])
+        self.assertEqual(len(declarations), 3)
+
+    def test_scrape_header_types_skips_functions(self):
+        header_file_content = ('// typedef int fake_t;\n/* typedef int other_t; */\n'
+                               'typedef int32_t indy_handle_t;\ntypedef enum { Success = 0 } indy_error_t;\n'
+                               'extern indy_error_t indy_broken(indy_handle_t command_handle,);')
+
+        type_map, enums = header_scraping.scrape_header_types(header_file_content)
+
+        self.assertEqual(type_map, {'indy_handle_t': 'int32_t'})
+        self.assertEqual(enums, [EnumDeclaration('indy_error_t', [('Success', 0)])])
+
+    def test_scrape_header_types_matches_scrape_header_file(self):
+        header_file_content = ('static const char *s = "typedef x; // not a comment";\n'
+                               'typedef struct { struct { int32_t a; } inner; int32_t b; } indy_pair_t;\n'
+                               'typedef int32_t indy_handle_t;\n' + TEST_HEADER_FILE)
+
+        type_map, enums = header_scraping.scrape_header_types(header_file_content)
+        _, full_type_map, full_enums = header_scraping.scrape_header_file(header_file_content)
+
+        self.assertEqual(type_map['indy_handle_t'], 'int32_t')
+        self.assertNotIn('indy_pair_t', type_map)
+        self.assertEqual((type_map, enums), (full_type_map, full_enums))
@@ -0,0 +1,45 @@
+import unittest
+
+from indygo_generator.profiling import GenerationProfile, NullProfile
+
+
+class GenerationProfileTests(unittest.TestCase):
+    def test_record_accumulates_phase_totals(self):
+        profile = GenerationProfile()
+
+        profile.record('scraping', 0.5, bytes_produced=10)
+        profile.record('scraping', 0.25, calls=2, bytes_produced=5)
+
+        self.assertEqual(profile.report()['phases'], {'scraping': {'seconds': 0.75, 'calls': 3, 'bytes': 15}})
+
+    def test_keeps_only_slowest_declarations(self):
+        profile = GenerationProfile(slowest_declarations_count=2)
+
+        profile.record_declaration('indy_ledger.h', 'submit_request', 0.1)
+        profile.record_declaration('indy_ledger.h', 'sign_request', 0.3)
+        profile.record_declaration('indy_anoncreds.h', 'prover_create_proof', 0.2)
+
+        slowest_declarations = profile.report()['slowest_declarations']
+        self.assertEqual([item['name'] for item in slowest_declarations], ['sign_request', 'prover_create_proof'])
+
+    def test_merge_worker_profile(self):
+        profile = GenerationProfile(slowest_declarations_count=1)
+        worker_profile = profile.create_worker_profile()
+        profile.record('emission', 1.0)
+        worker_profile.record('emission', 2.0)
+        worker_profile.record_declaration('indy_ledger.h', 'sign_request', 0.3)
+
+        profile.merge(worker_profile)
+
+        report = profile.report()
+        self.assertEqual(report['phases']['emission'], {'seconds': 3.0, 'calls': 2, 'bytes': 0})
+        self.assertEqual(report['slowest_declarations'][0]['name'], 'sign_request')
+
+    def test_null_profile_is_disabled(self):
+        profile = NullProfile()
+
+        with profile.session(), profile.phase('reading'):
+            profile.record('reading', 1.0)
+
+        self.assertFalse(profile.enabled)
+        self.assertIs(profile.create_worker_profile(), profile)
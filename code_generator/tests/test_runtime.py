@@ -0,0 +1,22 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from indygo_generator.generator import Generator
+
+
+class RuntimeTests(unittest.TestCase):
+    @unittest.skipIf(shutil.which('go') is None, 'go is not installed')
+    def test_registry_tests_pass_with_race_detector(self):
+        with tempfile.TemporaryDirectory() as header_path, tempfile.TemporaryDirectory() as output_path:
+            Generator(header_path, output_path).generate()
+            with open(os.path.join(output_path, 'go.mod'), 'w') as f:
+                f.write('module indy\n\ngo 1.19\n')
+
+            result = subprocess.run(['go', 'test', '-race', '-count', '1', '-run', 'TestCallRegistry', '.'],
+                                    cwd=output_path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                    timeout=600)
+
+        self.assertEqual(result.returncode, 0, result.stdout)
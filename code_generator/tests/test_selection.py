@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from indygo_generator.generator import Generator, GeneratorError
+from indygo_generator.selection import FunctionSelection
+from indygo_generator.types import FunctionDeclaration
+from . import TEST_HEADER_FILE
+
+
+class FunctionSelectionTests(unittest.TestCase):
+    def setUp(self):
+        self.declarations = {
+            'indy_ledger.h': [FunctionDeclaration(name=name, return_type='int32_t', parameters=[])
+                              for name in ('sign_request', 'submit_request', 'sign_and_submit_request')],
+            'indy_wallet.h': [FunctionDeclaration(name='open_wallet', return_type='int32_t', parameters=[])],
+        }
+
+    def _selected_names(self, selection):
+        return {file_name: [declaration.name for declaration in declarations]
+                for file_name, declarations in selection.select(self.declarations).items()}
+
+    def test_selects_everything_without_criteria(self):
+        self.assertEqual(self._selected_names(FunctionSelection()), {
+            'indy_ledger.h': ['sign_request', 'submit_request', 'sign_and_submit_request'],
+            'indy_wallet.h': ['open_wallet'],
+        })
+
+    def test_include_and_exclude_patterns(self):
+        selection = FunctionSelection(include_patterns=['indy_sign_*', 'OpenWallet'],
+                                      exclude_patterns=['*SubmitRequest'])
+
+        self.assertEqual(self._selected_names(selection), {
+            'indy_ledger.h': ['sign_request'],
+            'indy_wallet.h': ['open_wallet'],
+        })
+
+    def test_selects_functions_referenced_in_go_sources(self):
+        with tempfile.TemporaryDirectory() as source_path:
+            bindings_path = os.path.join(source_path, 'indy')
+            os.makedirs(os.path.join(source_path, 'service'))
+            os.makedirs(bindings_path)
+            with open(os.path.join(source_path, 'service', 'service.go'), 'w') as f:
+                f.write('package service\n\nfunc run() {\n\tindy.SubmitRequestAsync(1, "{}").Wait()\n}\n')
+            with open(os.path.join(bindings_path, 'ledger.go'), 'w') as f:
+                f.write('package indy\n\nfunc SignRequest() {}\n')
+
+            selection = FunctionSelection(go_source_path=source_path, ignored_paths=[bindings_path])
+            selected_names = self._selected_names(selection)
+
+        self.assertEqual(selected_names, {'indy_ledger.h': ['submit_request'], 'indy_wallet.h': []})
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generator_emits_only_selected_functions(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            Generator(Mock(), output_path, selection=FunctionSelection(include_patterns=['SignRequest'])).generate()
+            with open(os.path.join(output_path, 'ledger.go'), 'r') as f:
+                go_code = f.read()
+            with open(os.path.join(output_path, 'ledger.c'), 'r') as f:
+                c_code = f.read()
+
+        self.assertIn('func SignRequest(', go_code)
+        self.assertNotIn('func SubmitRequest(', go_code)
+        self.assertNotIn('"indy_submit_request"', go_code)
+        self.assertIn('indy_sign_request_proxy', c_code)
+        self.assertNotIn('indy_submit_request_proxy', c_code)
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generator_reports_unreadable_go_sources(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+        selection = FunctionSelection(go_source_path='/nonexistent')
+
+        with tempfile.TemporaryDirectory() as output_path:
+            with self.assertRaises(GeneratorError):
+                Generator(Mock(), output_path, selection=selection).generate()
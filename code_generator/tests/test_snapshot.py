@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from indygo_generator import generator as generator_module, header_scraping
+from indygo_generator.generator import Generator
+from indygo_generator.header_scraping import scrape_header_file
+from indygo_generator.snapshot import DeclarationSnapshot, content_hash
+from indygo_generator.types import EnumDeclaration
+
+from . import TEST_HEADER_FILE
+
+
+ERROR_ENUM_HEADER = 'typedef enum {\n    Success = 0,\n    CommonInvalidParam1 = 100,\n} indy_error_t;\n'
+
+
+class DeclarationSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.temp_dir.name, 'declarations.snapshot')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        declarations, type_map, enums = scrape_header_file(ERROR_ENUM_HEADER + TEST_HEADER_FILE)
+        header_hash = content_hash(TEST_HEADER_FILE)
+        snapshot = DeclarationSnapshot(self.snapshot_path, salt='salt')
+        snapshot.put('indy_ledger.h', header_hash, declarations, type_map, enums)
+        snapshot.save()
+
+        loaded_snapshot = DeclarationSnapshot(self.snapshot_path, salt='salt')
+        loaded_snapshot.load()
+
+        self.assertEqual(loaded_snapshot.get('indy_ledger.h', header_hash), (declarations, type_map, enums))
+        self.assertEqual(enums, [EnumDeclaration('indy_error_t', [('Success', 0), ('CommonInvalidParam1', 100)])])
+        self.assertIsNone(loaded_snapshot.get('indy_ledger.h', content_hash(TEST_HEADER_FILE + ' ')))
+        self.assertIsNone(loaded_snapshot.get('indy_pool.h', header_hash))
+
+    def test_salt_mismatch_discards_snapshot(self):
+        snapshot = DeclarationSnapshot(self.snapshot_path, salt='salt')
+        snapshot.put('indy_ledger.h', 'hash', [], {}, [])
+        snapshot.save()
+
+        loaded_snapshot = DeclarationSnapshot(self.snapshot_path, salt='other salt')
+        loaded_snapshot.load()
+
+        self.assertIsNone(loaded_snapshot.get('indy_ledger.h', 'hash'))
+
+    def test_generator_scrapes_only_changed_headers(self):
+        header_dir = os.path.join(self.temp_dir.name, 'headers')
+        os.mkdir(header_dir)
+        for file_name in ('indy_ledger.h', 'indy_pool.h'):
+            with open(os.path.join(header_dir, file_name), 'w') as f:
+                f.write(TEST_HEADER_FILE)
+        Generator(header_dir, self.temp_dir.name, snapshot_path=self.snapshot_path)._prepare_c_function_declarations()
+        with open(os.path.join(header_dir, 'indy_pool.h'), 'w') as f:
+            f.write(TEST_HEADER_FILE.replace('indy_sign_request', 'indy_pool_sign_request'))
+
+        generator = Generator(header_dir, self.temp_dir.name, snapshot_path=self.snapshot_path)
+        with patch.object(generator_module, 'scrape_header_file', wraps=scrape_header_file) as scrape_patch:
+            generator._prepare_c_function_declarations()
+
+        self.assertEqual(scrape_patch.call_count, 1)
+        declaration_names = {file_name: [declaration.name for declaration in declarations]
+                             for file_name, declarations in generator._c_function_declarations.items()}
+        self.assertEqual(declaration_names['indy_ledger.h'], ['sign_and_submit_request', 'submit_request', 'sign_request'])
+        self.assertEqual(declaration_names['indy_pool.h'], ['sign_and_submit_request', 'submit_request', 'pool_sign_request'])
+        self.assertEqual(generator._c_function_declarations['indy_ledger.h'][0].return_type, 'int32_t')
+
+    def test_generator_takes_enums_from_snapshot(self):
+        header_dir = os.path.join(self.temp_dir.name, 'headers')
+        os.mkdir(header_dir)
+        with open(os.path.join(header_dir, 'indy_mod.h'), 'w') as f:
+            f.write(ERROR_ENUM_HEADER)
+        Generator(header_dir, self.temp_dir.name, snapshot_path=self.snapshot_path).generate()
+        os.remove(os.path.join(self.temp_dir.name, 'indy_errors.go'))
+
+        with patch.object(header_scraping, '_Parser') as parser_patch:
+            Generator(header_dir, self.temp_dir.name, snapshot_path=self.snapshot_path).generate()
+        with open(os.path.join(self.temp_dir.name, 'indy_errors.go')) as f:
+            errors_code = f.read()
+
+        parser_patch.assert_not_called()
+        self.assertIn('ErrCommonInvalidParam1 = &IndyError{Code: 100', errors_code)
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from indygo_generator.generator import Generator
+from indygo_generator.stubs import generate_benchmark_code, generate_stub_library_code
+from indygo_generator.types import CallbackDeclaration, FunctionDeclaration, FunctionParameter
+from . import TEST_HEADER_FILE
+
+
+class StubTests(unittest.TestCase):
+    def setUp(self):
+        params = [
+            FunctionParameter(name='command_handle', type='int32_t'),
+            FunctionParameter(name='wallet_handle', type='int32_t'),
+            FunctionParameter(name='message_raw', type='uint8_t *'),
+            FunctionParameter(name='message_len', type='uint32_t'),
+            CallbackDeclaration(
+                name='cb',
+                return_type='void',
+                parameters=[
+                    FunctionParameter(name='xcommand_handle', type='int32_t'),
+                    FunctionParameter(name='err', type='int32_t'),
+                    FunctionParameter(name='verkey', type='const char *'),
+                    FunctionParameter(name='signature_raw', type='uint8_t *'),
+                    FunctionParameter(name='signature_len', type='uint32_t'),
+                ])
+        ]
+        self.indy_function = FunctionDeclaration(name='crypto_sign', return_type='int32_t', parameters=params)
+
+    def test_stub_calls_callback_with_canned_results(self):
+        code = generate_stub_library_code([self.indy_function])
+
+        self.assertIn('static void stub_complete_crypto_sign(void *cb, int32_t command_handle) {\n'
+                      '    ((void (*)(int32_t, int32_t, const char *, uint8_t *, uint32_t))cb)'
+                      '(command_handle, 0, (const char *)stub_json, (uint8_t *)stub_bytes, sizeof(stub_bytes));\n}', code)
+        self.assertIn('int32_t indy_crypto_sign(int32_t command_handle, int32_t wallet_handle, uint8_t * message_raw, '
+                      'uint32_t message_len, void (*cb)(int32_t, int32_t, const char *, uint8_t *, uint32_t)) {\n'
+                      '    return stub_dispatch(stub_complete_crypto_sign, (void *)cb, command_handle);\n}', code)
+
+    def test_benchmark_runs_function_in_parallel(self):
+        code = generate_benchmark_code([self.indy_function])
+
+        self.assertIn('func BenchmarkCryptoSign(b *testing.B) {', code)
+        self.assertIn('b.RunParallel(func(pb *testing.PB) {', code)
+        self.assertIn('if _, _, err := CryptoSign(1, benchmarkBytes); err != nil {', code)
+
+    def test_benchmark_skips_functions_without_canned_arguments(self):
+        params = [
+            FunctionParameter(name='command_handle', type='int32_t'),
+            CallbackDeclaration(name='create_fn', return_type='int32_t',
+                                parameters=[FunctionParameter(name='name', type='const char *')]),
+            CallbackDeclaration(name='cb', return_type='void',
+                                parameters=[FunctionParameter(name='xcommand_handle', type='int32_t'),
+                                            FunctionParameter(name='err', type='int32_t')])
+        ]
+        indy_function = FunctionDeclaration(name='register_wallet_storage', return_type='int32_t', parameters=params)
+
+        self.assertIsNone(generate_benchmark_code([indy_function]))
+
+    @patch.object(Generator, '_read_header_files')
+    def test_generate_writes_stub_files(self, read_header_files_patch):
+        read_header_files_patch.return_value = {'indy_ledger.h': TEST_HEADER_FILE}
+
+        with tempfile.TemporaryDirectory() as output_path:
+            Generator(Mock(), output_path, stubs=True).generate()
+            file_names = sorted(os.listdir(output_path))
+            stub_file_names = os.listdir(os.path.join(output_path, 'stub'))
+
+        self.assertEqual(file_names, ['indy_errors.go', 'indy_registry_test.go', 'indy_runtime.go',
+                                      'indy_stub_main_test.go', 'ledger.c', 'ledger.go', 'ledger_bench_test.go',
+                                      'stub'])
+        self.assertEqual(stub_file_names, ['indy_stub.c'])
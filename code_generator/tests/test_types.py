@@ -1,6 +1,8 @@
 import unittest
 
-from indygo_generator.types import FunctionDeclaration, FunctionParameter, CallbackDeclaration, GoFunction
+from indygo_generator import types
+from indygo_generator.types import (FunctionDeclaration, FunctionParameter, CallbackDeclaration, GoFunction, get_cgo_type,
+                                    get_go_type, parse_c_type, TypeGraph, TypeGraphError, clear_interned_tuples)
 
 
 class FunctionTests(unittest.TestCase):
@@ -10,7 +12,7 @@ class FunctionTests(unittest.TestCase):
             FunctionParameter(name='wallet_handle', type='int32_t'),
             FunctionParameter(name='submitter_did', type='const char *'),
             FunctionParameter(name='request_json', type='const char *'),
-            CallbackDeclaration(
+            CallbackDeclaration(name='cb',
                 return_type='void',
                 parameters=[
                     FunctionParameter(name='xcommand_handle', type='int32_t'),
@@ -26,7 +28,7 @@ class FunctionTests(unittest.TestCase):
             FunctionParameter(name='wallet_handle', type='int32_t'),
             FunctionParameter(name='submitter_did', type='const char *'),
             FunctionParameter(name='request_json', type='const char *'),
-            CallbackDeclaration(
+            CallbackDeclaration(name='cb',
                 return_type='void',
                 parameters=[
                     FunctionParameter(name='xcommand_handle', type='int32_t'),
@@ -43,7 +45,7 @@ class FunctionTests(unittest.TestCase):
         go_function = GoFunction.create_from_indy_declaration(self.simple_indy_function)
 
         self.assertEqual(go_function.name, 'SignRequest')
-        self.assertEqual(go_function.return_types, ['error'])
+        self.assertEqual(go_function.return_types, ('error',))
         params = go_function.parameters
         self.assertEqual(len(params), 3)
         param_0 = params[0]
@@ -76,7 +78,7 @@ class FunctionTests(unittest.TestCase):
         go_function = GoFunction.create_from_indy_declaration(self.complex_indy_function)
 
         self.assertEqual(go_function.name, 'SignRequest')
-        self.assertEqual(go_function.return_types, ['string', 'error'])
+        self.assertEqual(go_function.return_types, ('string', 'error'))
         params = go_function.parameters
         self.assertEqual(len(params), 3)
         param_0 = params[0]
@@ -108,3 +110,135 @@ class FunctionTests(unittest.TestCase):
         self.assertEqual(result_struct.fields[1].type, 'string')
 
         self.assertEqual(go_function.indy_function, self.complex_indy_function)
+
+
+    def test_go_function_buffers(self):
+        params = [
+            FunctionParameter(name='command_handle', type='int32_t'),
+            FunctionParameter(name='signer_vk', type='const char *'),
+            FunctionParameter(name='message_raw', type='const uint8_t *'),
+            FunctionParameter(name='message_len', type='uint32_t'),
+            FunctionParameter(name='flags', type='uint32_t'),
+            CallbackDeclaration(name='cb',
+                return_type='void',
+                parameters=[
+                    FunctionParameter(name='xcommand_handle', type='int32_t'),
+                    FunctionParameter(name='err', type='int32_t'),
+                    FunctionParameter(name='signature_raw', type='const uint8_t *'),
+                    FunctionParameter(name='signature_len', type='uint32_t'),
+                ])
+        ]
+        indy_function = FunctionDeclaration(name='crypto_sign', return_type='int32_t', parameters=params)
+
+        go_function = GoFunction.create_from_indy_declaration(indy_function)
+
+        self.assertEqual([(param.name, param.type, param.length) for param in go_function.parameters],
+                         [('signerVk', 'string', None), ('messageRaw', '[]byte', 'messageLen'),
+                          ('flags', 'uint32', None)])
+        self.assertEqual(go_function.return_types, ('[]byte', 'error'))
+        self.assertEqual([(field.name, field.type, field.length) for field in go_function.result_struct.fields],
+                         [('err', 'int32', None), ('signatureRaw', '[]byte', 'signatureLen')])
+        self.assertEqual([param.type for param in go_function.callback.parameters],
+                         ['int32', 'int32', '*C.uint8_t', 'uint32'])
+
+
+class CTypeTests(unittest.TestCase):
+    def test_parse_c_type_normalizes_spelling(self):
+        for spelling in ['const char *', 'const char*', 'char*', 'char  *', 'char const *']:
+            c_type = parse_c_type(spelling)
+            self.assertEqual(c_type.spelling, 'char *')
+            self.assertEqual(c_type.base, 'char')
+            self.assertEqual(c_type.pointer_depth, 1)
+
+        self.assertTrue(parse_c_type('const char*').is_const)
+        self.assertFalse(parse_c_type('char*').is_const)
+        self.assertEqual(parse_c_type('char **').spelling, 'char **')
+        self.assertEqual(parse_c_type('unsigned long long').spelling, 'unsigned long long')
+
+    def test_parse_c_type_is_interned(self):
+        self.assertIs(parse_c_type('const char*'), parse_c_type('const char*'))
+
+    def test_go_and_cgo_types_do_not_depend_on_spelling(self):
+        self.assertEqual(get_go_type('const char*'), 'string')
+        self.assertEqual(get_go_type('const char *'), 'string')
+        self.assertEqual(get_cgo_type('const char*'), '*C.char')
+        self.assertEqual(get_cgo_type('char *'), '*C.char')
+        self.assertEqual(get_cgo_type('int32_t'), 'int32')
+        with self.assertRaises(KeyError):
+            get_go_type('struct unknown *')
+
+    def test_resolve_alias_keeps_pointer_depth(self):
+        param = FunctionParameter(name='handle', type='indy_handle_t')
+        self.assertEqual(param.resolve_alias({'indy_handle_t': 'int32_t'}).type, 'int32_t')
+
+        param = FunctionParameter(name='data', type='const indy_u8_t*')
+        self.assertEqual(param.resolve_alias({'indy_u8_t': 'uint8_t'}).type, 'uint8_t *')
+
+
+class TypeGraphTests(unittest.TestCase):
+    def test_resolves_alias_chains(self):
+        type_graph = TypeGraph({'indy_handle_t': 'indy_i32_t', 'indy_i32_t': 'int32_t', 'indy_data_t': 'indy_u8_t *',
+                                'indy_u8_t': 'const uint8_t'})
+
+        self.assertEqual(type_graph.aliases, {'indy_handle_t': 'int32_t', 'indy_i32_t': 'int32_t',
+                                              'indy_data_t': 'uint8_t *', 'indy_u8_t': 'uint8_t'})
+        self.assertEqual(type_graph.resolved['indy_handle_t'], 'int32_t')
+        self.assertEqual(type_graph.resolved['indy_data_t *'], 'uint8_t **')
+        self.assertEqual(type_graph.resolved['const char *'], 'const char *')
+
+    def test_resolved_types_are_memoized(self):
+        resolved_types = TypeGraph({'indy_handle_t': 'int32_t'}).resolved
+
+        resolved_types['indy_handle_t']
+
+        self.assertEqual(dict(resolved_types), {'indy_handle_t': 'int32_t'})
+
+    def test_cyclic_typedefs_raise(self):
+        with self.assertRaises(TypeGraphError):
+            TypeGraph({'a_t': 'b_t *', 'b_t': 'c_t', 'c_t': 'a_t'})
+
+    def test_resolve_alias_follows_chains(self):
+        param = FunctionParameter(name='handle', type='indy_handle_t')
+        resolved_types = TypeGraph({'indy_handle_t': 'indy_i32_t', 'indy_i32_t': 'int32_t'}).resolved
+
+        self.assertEqual(param.resolve_alias(resolved_types).type, 'int32_t')
+
+
+class IntermediateRepresentationTests(unittest.TestCase):
+    def _make_callback(self):
+        return CallbackDeclaration(name='cb', return_type='void', parameters=[
+            FunctionParameter(name='xcommand_handle', type='int32_t'),
+            FunctionParameter(name='err', type='int32_t'),
+        ])
+
+    def test_records_are_immutable_and_slotted(self):
+        param = FunctionParameter(name='wallet_handle', type='int32_t')
+
+        with self.assertRaises(AttributeError):
+            param.type = 'int64_t'
+        with self.assertRaises(AttributeError):
+            param.extra = 1
+
+    def test_identical_callback_signatures_share_parameters(self):
+        self.assertIs(self._make_callback().parameters, self._make_callback().parameters)
+
+    def test_cleared_interned_tuples_are_not_kept(self):
+        parameters = self._make_callback().parameters
+        clear_interned_tuples()
+
+        self.assertNotIn(parameters, types._interned_tuples)
+        self.assertIsNot(self._make_callback().parameters, parameters)
+        self.assertEqual(self._make_callback().parameters, parameters)
+
+    def test_resolve_alias_returns_new_declaration(self):
+        declaration = FunctionDeclaration(name='sign_request', return_type='indy_error_t', parameters=[
+            FunctionParameter(name='command_handle', type='indy_handle_t'),
+            self._make_callback(),
+        ])
+
+        resolved_declaration = declaration.resolve_alias({'indy_error_t': 'int32_t', 'indy_handle_t': 'int32_t'})
+
+        self.assertEqual(declaration.return_type, 'indy_error_t')
+        self.assertEqual(resolved_declaration.return_type, 'int32_t')
+        self.assertEqual(resolved_declaration.parameters[0].type, 'int32_t')
+        self.assertIs(resolved_declaration.callback.parameters, self._make_callback().parameters)
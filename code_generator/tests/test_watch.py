@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from indygo_generator import generator as generator_module
+from indygo_generator.generator import Generator
+from indygo_generator.watch import HeaderWatcher
+
+from . import TEST_HEADER_FILE
+
+
+class HeaderWatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.header_dir = tempfile.TemporaryDirectory()
+        self.output_dir = tempfile.TemporaryDirectory()
+        self._write_header('indy_ledger.h', TEST_HEADER_FILE)
+        self._write_header('indy_pool.h', TEST_HEADER_FILE.replace('indy_sign_request', 'indy_pool_sign_request'))
+        self.generator = Generator(self.header_dir.name, self.output_dir.name)
+        self.watcher = HeaderWatcher(self.generator)
+        self.watcher.start()
+
+    def tearDown(self):
+        self.header_dir.cleanup()
+        self.output_dir.cleanup()
+
+    def _write_header(self, file_name, content):
+        path = os.path.join(self.header_dir.name, file_name)
+        mtime_ns = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+        with open(path, 'w') as f:
+            f.write(content)
+        # mtime resolution of the file system may be too coarse to notice the change otherwise
+        os.utime(path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+
+    def _read_output(self, file_name):
+        with open(os.path.join(self.output_dir.name, file_name)) as f:
+            return f.read()
+
+    def test_poll_without_changes(self):
+        with patch.object(generator_module, 'scrape_header_file') as scrape_patch:
+            changed_file_names, removed_file_names = self.watcher.poll()
+
+        scrape_patch.assert_not_called()
+        self.assertEqual(changed_file_names, [])
+        self.assertEqual(removed_file_names, [])
+
+    def test_poll_regenerates_only_changed_header(self):
+        pool_go_code = self._read_output('pool.go')
+        self._write_header('indy_ledger.h', TEST_HEADER_FILE.replace('indy_sign_request', 'indy_sign_ledger_request'))
+
+        with patch.object(generator_module, 'scrape_header_file', wraps=generator_module.scrape_header_file) \
+                as scrape_patch:
+            changed_file_names, _ = self.watcher.poll()
+
+        self.assertEqual(changed_file_names, ['indy_ledger.h'])
+        self.assertEqual(scrape_patch.call_count, 1)
+        self.assertIn('func SignLedgerRequest(', self._read_output('ledger.go'))
+        self.assertEqual(pool_go_code, self._read_output('pool.go'))
+
+    def test_typedef_change_regenerates_everything(self):
+        self._write_header('indy_types.h', 'typedef int32_t indy_extra_t;')
+
+        with patch.object(Generator, '_generate', wraps=self.generator._generate) as generate_patch:
+            changed_file_names, _ = self.watcher.poll()
+
+        self.assertEqual(changed_file_names, ['indy_types.h'])
+        generate_patch.assert_called_once()
+
+    def test_removed_header_removes_output(self):
+        os.remove(os.path.join(self.header_dir.name, 'indy_pool.h'))
+
+        _, removed_file_names = self.watcher.poll()
+
+        self.assertEqual(removed_file_names, ['indy_pool.h'])
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir.name, 'pool.go')))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir.name, 'ledger.go')))
+
+    def test_cache_does_not_grow_over_session(self):
+        cache_path = os.path.join(self.output_dir.name, 'fragments.json')
+        watcher = HeaderWatcher(Generator(self.header_dir.name, self.output_dir.name, cache_path=cache_path))
+        watcher.start()
+
+        entry_counts = []
+        for i in range(3):
+            self._write_header('indy_ledger.h', TEST_HEADER_FILE.replace('indy_sign_request', f'indy_sign_request_{i}'))
+            watcher.poll()
+            with open(cache_path) as f:
+                entry_counts.append(len(json.load(f)['entries']))
+
+        # The headers share the fragments of two identical declarations
+        self.assertEqual(entry_counts, [4, 4, 4])
+